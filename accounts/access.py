@@ -0,0 +1,109 @@
+"""
+Central access scoping.
+
+``get_access_scope(user)`` returns the AccessScope of a user: their role plus
+the organizations they administer and their active memberships. List views
+apply its ``Q`` filters instead of branching on ``user.role`` themselves.
+
+Role based filters need nothing but the user. The organization data is read
+lazily from the cache (``ACCESS_SCOPE_CACHE_TIMEOUT``) and is invalidated when
+a User, OrganizationMembership or Organization.admin_users changes.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+NOTHING = Q(pk__in=[])
+
+
+def _cache_key(user_id):
+    return f'access-scope:{user_id}'
+
+
+def invalidate_access_scope(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def get_access_scope(user):
+    """AccessScope of a user, built once per user object (i.e. once per request)"""
+    scope = getattr(user, '_access_scope', None)
+    if scope is None:
+        scope = AccessScope(user)
+        user._access_scope = scope
+    return scope
+
+
+class AccessScope:
+    def __init__(self, user):
+        self.user_id = user.pk
+        self.role = user.role
+        self._organizations = None
+
+    @property
+    def is_platform_admin(self):
+        return self.role == 'superadmin'
+
+    @property
+    def organization_ids(self):
+        """Ids of the organizations the user administers"""
+        return self._load_organizations()['organization_ids']
+
+    @property
+    def memberships(self):
+        """Active memberships as {organization id: membership role}"""
+        return self._load_organizations()['memberships']
+
+    def certificates(self, prefix=''):
+        """Certificates the user may list; ``prefix`` reaches them through a relation"""
+        if self.role in ('superadmin', 'checker'):
+            # Checker can view all certificates for verification purposes
+            return Q()
+        if self.role == 'admin':
+            return Q(**{f'{prefix}issuer': self.user_id})
+        if self.role == 'student':
+            return Q(**{f'{prefix}holder': self.user_id})
+        return NOTHING
+
+    def certificate_activity(self, prefix='certificate__', issuer_field=None):
+        """Verifications, logs and transactions of the certificates the user issued or holds.
+
+        ``issuer_field`` names a denormalized issuer column to filter on
+        instead of joining the certificate.
+        """
+        if self.role == 'superadmin':
+            return Q()
+        if self.role == 'admin':
+            return Q(**{issuer_field or f'{prefix}issuer': self.user_id})
+        if self.role in ('student', 'checker'):
+            return Q(**{f'{prefix}holder': self.user_id})
+        return NOTHING
+
+    def organizations(self):
+        """Verified active organizations, plus the ones the user administers or belongs to"""
+        if self.is_platform_admin:
+            return Q()
+        visible = Q(is_verified=True, is_active=True)
+        own = set(self.organization_ids) | set(self.memberships)
+        if own:
+            visible |= Q(pk__in=own)
+        return visible
+
+    def _load_organizations(self):
+        if self._organizations is None:
+            key = _cache_key(self.user_id)
+            self._organizations = cache.get(key)
+            if self._organizations is None:
+                from organizations.models import Organization, OrganizationMembership
+                self._organizations = {
+                    'organization_ids': [
+                        str(pk) for pk in
+                        Organization.objects.filter(admin_users=self.user_id).values_list('pk', flat=True)
+                    ],
+                    'memberships': {
+                        str(organization_id): role for organization_id, role in
+                        OrganizationMembership.objects.filter(user=self.user_id, is_active=True)
+                        .values_list('organization_id', 'role')
+                    },
+                }
+                cache.set(key, self._organizations, timeout=settings.ACCESS_SCOPE_CACHE_TIMEOUT)
+        return self._organizations
@@ -0,0 +1,97 @@
+"""
+Stateless JWT authentication.
+
+Access tokens carry the user fields almost every view reads (role, the
+permission flags). StatelessJWTAuthentication builds ``request.user`` from
+those claims without a database query; the user is a TokenUser, a proxy of
+User whose other columns are deferred and loaded together, in one query, the
+first time any of them is read.
+
+Claims can go stale, so changing them (or the password) puts the user on a
+Redis denylist for one access token lifetime: access tokens issued before
+the change are rejected and the client refreshes, which re-reads the user.
+"""
+import math
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import TokenUser
+
+User = get_user_model()
+
+
+def _revoked_key(user_id):
+    return f'auth:revoked:{user_id}'
+
+
+def user_claims(user):
+    return {name: getattr(user, name) for name in User.TOKEN_CLAIM_FIELDS}
+
+
+def now():
+    """Current Unix time; the clock token revocations are stamped with"""
+    return time.time()
+
+
+def revoke_user_tokens(user_id):
+    """Reject the user's access tokens issued until now.
+
+    ``iat`` has whole-second precision, so the denylist stores the first
+    whole second whose tokens are accepted again; tokens from the second of
+    the revocation itself are rejected too.
+    """
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    cache.set(_revoked_key(user_id), math.ceil(now()), timeout=int(lifetime) + 2)
+
+
+class CertifyNowRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry fresh user claims"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.user = user
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user = getattr(self, 'user', None)
+        if user is None:
+            # Refresh: read the current row so changed claims take effect
+            user = User.objects.filter(**{api_settings.USER_ID_FIELD: self[api_settings.USER_ID_CLAIM]}).first()
+            if user is None or not user.is_active:
+                raise InvalidToken('Foydalanuvchi topilmadi yoki faol emas')
+        for claim, value in user_claims(user).items():
+            access[claim] = value
+        return access
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that takes the user from token claims instead of the database"""
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            # Token issued before claims were added
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token foydalanuvchi identifikatorini o\'z ichiga olmaydi')
+
+        revoked_at = cache.get(_revoked_key(user_id))
+        if revoked_at is not None and validated_token.get('iat', 0) < revoked_at:
+            raise AuthenticationFailed('Token bekor qilingan', code='token_revoked')
+
+        if not validated_token['is_active']:
+            raise AuthenticationFailed('Foydalanuvchi faol emas', code='user_inactive')
+
+        claims = {name: validated_token[name] for name in User.TOKEN_CLAIM_FIELDS if name in validated_token}
+        return TokenUser.from_claims(user_id, claims)
@@ -1,5 +1,5 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 import uuid
 
@@ -30,6 +30,11 @@ class User(AbstractUser):
     created_at = models.DateTimeField(_('Yaratilgan vaqt'), auto_now_add=True)
     updated_at = models.DateTimeField(_('Yangilangan vaqt'), auto_now=True)
 
+    # Columns copied into access tokens (see accounts.authentication)
+    TOKEN_CLAIM_FIELDS = ('email', 'role', 'can_create_certificates', 'is_active', 'is_staff', 'is_superuser')
+    # Columns copied into cached certificate verification payloads (see verification.cache)
+    VERIFICATION_FIELDS = ('first_name', 'last_name', 'email')
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
@@ -40,6 +45,54 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.get_full_name()} ({self.email})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_claims = instance.token_claims()
+        instance._loaded_verification_fields = instance.verification_fields()
+        return instance
+
+    def token_claims(self):
+        """Values copied into access tokens; None while any of them is deferred"""
+        if self.get_deferred_fields() & set(self.TOKEN_CLAIM_FIELDS):
+            return None
+        return {name: getattr(self, name) for name in self.TOKEN_CLAIM_FIELDS}
+
+    def verification_fields(self):
+        """Values cached with the user's certificates; None while any of them is deferred"""
+        if self.get_deferred_fields() & set(self.VERIFICATION_FIELDS):
+            return None
+        return tuple(getattr(self, name) for name in self.VERIFICATION_FIELDS)
+
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        self._password_changed = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        # Access tokens carry claims; reject the old ones once they are stale
+        loaded_claims = getattr(self, '_loaded_claims', None)
+        claims = self.token_claims()
+        if getattr(self, '_password_changed', False) or (loaded_claims is not None and claims != loaded_claims):
+            from accounts.authentication import revoke_user_tokens
+            user_id = self.pk
+            transaction.on_commit(lambda: revoke_user_tokens(user_id), robust=True)
+        self._loaded_claims = claims
+        self._password_changed = False
+
+        # Verification payloads of their certificates show the name and hash the email
+        loaded_fields = getattr(self, '_loaded_verification_fields', None)
+        fields = self.verification_fields()
+        if loaded_fields is not None and fields != loaded_fields:
+            from verification.cache import invalidate_user_verification_entries
+            user_id = self.pk
+            transaction.on_commit(lambda: invalidate_user_verification_entries(user_id), robust=True)
+        self._loaded_verification_fields = fields
+
+        from accounts.access import invalidate_access_scope
+        invalidate_access_scope(self.pk)
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
@@ -65,6 +118,27 @@ class User(AbstractUser):
         return self.role == 'admin'
 
 
+class TokenUser(User):
+    """User built from access token claims; the other columns load on first access"""
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id, claims):
+        # Claims hold the id as a string; object comparisons need the real pk type
+        values = {'id': cls._meta.pk.to_python(user_id), **claims}
+        field_names = [field.attname for field in cls._meta.concrete_fields if field.attname in values]
+        return cls.from_db(None, field_names, [values[name] for name in field_names])
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # Reading one deferred column loads all of them, so a full user costs one query
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred:
+            fields = set(fields) | deferred
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(_('Biografiya'), blank=True)
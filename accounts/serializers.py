@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from accounts.authentication import CertifyNowRefreshToken
 from .models import User, UserProfile
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -73,6 +75,15 @@ class UserSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Compact read-only user, used where users are expanded in list rows"""
+    full_name = serializers.ReadOnlyField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'email', 'full_name', 'role', 'institution_name']
+        read_only_fields = fields
+
 class PasswordChangeSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
     new_password = serializers.CharField(required=True, validators=[validate_password])
@@ -88,3 +99,8 @@ class PasswordChangeSerializer(serializers.Serializer):
         if not user.check_password(value):
             raise serializers.ValidationError("Eski parol noto'g'ri")
         return value
+
+
+class CertifyNowTokenRefreshSerializer(TokenRefreshSerializer):
+    """Issue access tokens with the user's current claims"""
+    token_class = CertifyNowRefreshToken
@@ -0,0 +1,74 @@
+import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from accounts.authentication import StatelessJWTAuthentication, revoke_user_tokens
+from certifynow.testing import TEST_CACHES, create_certificate, create_user
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TokenRevocationTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user_id = str(uuid.uuid4())
+
+    def authenticate(self, iat):
+        return StatelessJWTAuthentication().get_user({
+            'user_id': self.user_id, 'iat': iat, 'email': 'talaba@example.com', 'role': 'student',
+            'can_create_certificates': False, 'is_active': True, 'is_staff': False, 'is_superuser': False,
+        })
+
+    def test_tokens_up_to_the_revocation_second_are_rejected(self):
+        # Only the revocation stamp is moved; the cache keeps its own clock
+        with mock.patch('accounts.authentication.now', return_value=1_700_000_000.4):
+            revoke_user_tokens(self.user_id)
+        for iat in (1_699_999_000, 1_700_000_000):
+            with self.subTest(iat=iat), self.assertRaises(AuthenticationFailed):
+                self.authenticate(iat)
+        self.assertEqual(str(self.authenticate(1_700_000_001).pk), self.user_id)
+
+    def test_token_user_has_a_real_primary_key(self):
+        user = self.authenticate(1_700_000_000)
+        self.assertEqual(user.pk, uuid.UUID(self.user_id))
+
+
+@override_settings(CACHES=TEST_CACHES, QR_CODE_SYNC=False)
+class BearerTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.holder = create_user('student')
+        self.issuer = create_user('admin')
+        self.certificate = create_certificate(self.holder, self.issuer)
+        self.url = f'/api/v1/certificates/{self.certificate.pk}/'
+
+    def client_for(self, user):
+        response = APIClient().post(
+            '/api/v1/auth/login/', {'email': user.email, 'password': 'test-password'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return client
+
+    def test_holder_and_issuer_can_open_their_certificate(self):
+        for user in (self.holder, self.issuer):
+            with self.subTest(role=user.role):
+                response = self.client_for(user).get(self.url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['id'], str(self.certificate.pk))
+
+    def test_other_users_cannot(self):
+        response = self.client_for(create_user('student')).get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_changed_claims_revoke_the_token(self):
+        client = self.client_for(self.holder)
+        with mock.patch('accounts.authentication.now', return_value=2 ** 40):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.holder.role = 'checker'
+                self.holder.save()
+        self.assertEqual(client.get(self.url).status_code, 401)
@@ -6,6 +6,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.authentication import CertifyNowRefreshToken
 from django.contrib.auth import get_user_model
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
@@ -46,7 +47,7 @@ class RegisterView(generics.CreateAPIView):
         user = serializer.save()
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = CertifyNowRefreshToken.for_user(user)
         
         return Response({
             'user': UserSerializer(user).data,
@@ -83,7 +84,7 @@ class LoginAPIView(APIView):
                 return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
             if user_obj and check_password(password, user_obj.password):
-                refresh = RefreshToken.for_user(user_obj)
+                refresh = CertifyNowRefreshToken.for_user(user_obj)
                 access_token = str(refresh.access_token)
 
                 return Response(
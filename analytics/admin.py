@@ -27,13 +27,18 @@ class SystemStatsAdmin(admin.ModelAdmin):
         'total_users',
         'active_users',
         'new_users',
+        'students_count',
+        'organizations_count',
+        'admins_count',
         'total_certificates',
         'new_certificates',
         'verified_certificates',
+        'pending_certificates',
         'total_organizations',
         'active_organizations',
         'total_verifications',
         'successful_verifications',
+        'new_verifications',
         'created_at',
     )
     list_filter = ('date',)
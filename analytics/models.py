@@ -38,11 +38,15 @@ class SystemStats(models.Model):
     total_users = models.IntegerField(default=0)
     active_users = models.IntegerField(default=0)
     new_users = models.IntegerField(default=0)
+    students_count = models.IntegerField(default=0)
+    organizations_count = models.IntegerField(default=0)
+    admins_count = models.IntegerField(default=0)
     
     # Certificate stats
     total_certificates = models.IntegerField(default=0)
     new_certificates = models.IntegerField(default=0)
     verified_certificates = models.IntegerField(default=0)
+    pending_certificates = models.IntegerField(default=0)
     
     # Organization stats
     total_organizations = models.IntegerField(default=0)
@@ -51,6 +55,7 @@ class SystemStats(models.Model):
     # Verification stats
     total_verifications = models.IntegerField(default=0)
     successful_verifications = models.IntegerField(default=0)
+    new_verifications = models.IntegerField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -28,6 +28,9 @@ class SystemStatsSerializer(serializers.ModelSerializer):
         return 0
 
 class AnalyticsOverviewSerializer(serializers.Serializer):
+    # Day of the SystemStats rollup the figures come from
+    date = serializers.DateField()
+    
     # User analytics
     total_users = serializers.IntegerField()
     active_users = serializers.IntegerField()
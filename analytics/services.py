@@ -0,0 +1,269 @@
+from datetime import datetime, time, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour, TruncDay, TruncWeek, TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from accounts.access import get_access_scope
+from certificates.models import Certificate
+from organizations.models import Organization
+from verification.models import VerificationRequest
+from .models import DashboardStats, SystemStats
+
+User = get_user_model()
+
+# granularity -> (truncate function, bucket width, label format)
+GRANULARITIES = {
+    'hour': (TruncHour, relativedelta(hours=1), '%Y-%m-%d %H:00'),
+    'day': (TruncDay, relativedelta(days=1), '%Y-%m-%d'),
+    'week': (TruncWeek, relativedelta(weeks=1), '%Y-%m-%d'),
+    'month': (TruncMonth, relativedelta(months=1), '%Y-%m'),
+}
+MAX_BUCKETS = 1000
+
+
+def month_start():
+    """Start of the current local (TIME_ZONE) month, used by all 'this month' counters"""
+    return timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def certificate_counts(certificates, since=None):
+    """Certificate counters for an already role-scoped queryset in a single query"""
+    since = since or month_start()
+    return certificates.aggregate(
+        total_certificates=Count('id'),
+        verified_certificates=Count('id', filter=Q(is_verified=True)),
+        pending_certificates=Count('id', filter=Q(status='draft')),
+        revoked_certificates=Count('id', filter=Q(status='revoked')),
+        certificates_this_month=Count('id', filter=Q(created_at__gte=since)),
+    )
+
+
+def verification_counts(verifications, since=None):
+    """VerificationRequest counters for an already role-scoped queryset in a single query"""
+    since = since or month_start()
+    return verifications.aggregate(
+        total_verifications=Count('id'),
+        successful_verifications=Count('id', filter=Q(verification_result=True)),
+        qr_verifications=Count('id', filter=Q(verification_method='qr')),
+        verifications_this_month=Count('id', filter=Q(verification_date__gte=since)),
+    )
+
+
+def success_rate(successful, total):
+    return round(successful / total * 100, 2) if total > 0 else 0
+
+
+def dashboard_querysets(user):
+    """Role-scoped certificate and verification querysets behind the dashboard"""
+    scope = get_access_scope(user)
+    return (
+        Certificate.objects.filter(scope.certificate_activity(prefix='')),
+        VerificationRequest.objects.filter(scope.certificate_activity(issuer_field='issuer')),
+    )
+
+
+def compute_dashboard_stats(user):
+    """Live dashboard counters for a user, in the shape of DashboardStats"""
+    certificates, verifications = dashboard_querysets(user)
+    this_month = month_start()
+    certificate_stats = certificate_counts(certificates, this_month)
+    verification_stats = verification_counts(verifications, this_month)
+    return {
+        'total_certificates': certificate_stats['total_certificates'],
+        'verified_certificates': certificate_stats['verified_certificates'],
+        'pending_certificates': certificate_stats['pending_certificates'],
+        'revoked_certificates': certificate_stats['revoked_certificates'],
+        'certificates_this_month': certificate_stats['certificates_this_month'],
+        'total_verifications': verification_stats['total_verifications'],
+        'successful_verifications': verification_stats['successful_verifications'],
+        'verifications_this_month': verification_stats['verifications_this_month'],
+    }
+
+
+def materialize_dashboard_stats(user):
+    """Recompute the DashboardStats row of a user and return it"""
+    stats, _ = DashboardStats.objects.update_or_create(
+        user=user, defaults=compute_dashboard_stats(user)
+    )
+    return stats
+
+
+def system_counts(start, end):
+    """SystemStats counters: totals of rows created before ``end``, new rows since ``start``"""
+    users = User.objects.filter(date_joined__lt=end).aggregate(
+        total_users=Count('id'),
+        active_users=Count('id', filter=Q(is_active=True)),
+        new_users=Count('id', filter=Q(date_joined__gte=start)),
+        students_count=Count('id', filter=Q(role='student')),
+        organizations_count=Count('id', filter=Q(role='organization')),
+        admins_count=Count('id', filter=Q(role='admin')),
+    )
+    certificates = Certificate.objects.filter(created_at__lt=end).aggregate(
+        total_certificates=Count('id'),
+        new_certificates=Count('id', filter=Q(created_at__gte=start)),
+        verified_certificates=Count('id', filter=Q(is_verified=True)),
+        pending_certificates=Count('id', filter=Q(status='draft')),
+    )
+    organizations = Organization.objects.filter(created_at__lt=end).aggregate(
+        total_organizations=Count('id'),
+        active_organizations=Count('id', filter=Q(is_active=True)),
+    )
+    verifications = VerificationRequest.objects.filter(verification_date__lt=end).aggregate(
+        total_verifications=Count('id'),
+        successful_verifications=Count('id', filter=Q(verification_result=True)),
+        new_verifications=Count('id', filter=Q(verification_date__gte=start)),
+    )
+    return {**users, **certificates, **organizations, **verifications}
+
+
+def rollup_overview():
+    """Latest SystemStats row with the summed new rows of this and last month, or None before the first rollup"""
+    latest = SystemStats.objects.first()
+    if latest is None:
+        return None
+    this_month = month_start().date()
+    last_month = this_month - relativedelta(months=1)
+    sums = {'new_users': Sum('new_users'), 'new_certificates': Sum('new_certificates'),
+            'new_verifications': Sum('new_verifications')}
+    current = SystemStats.objects.filter(date__gte=this_month).aggregate(**sums)
+    previous = SystemStats.objects.filter(date__gte=last_month, date__lt=this_month).aggregate(**sums)
+    # Sum() of no rows is None
+    return (
+        latest,
+        {name: value or 0 for name, value in current.items()},
+        {name: value or 0 for name, value in previous.items()},
+    )
+
+
+def live_overview():
+    """rollup_overview() computed from the raw tables up to now, without writing anything"""
+    now = timezone.now()
+    this_month = month_start()
+    current = system_counts(this_month, now)
+    previous = system_counts(this_month - relativedelta(months=1), this_month)
+    return SystemStats(date=timezone.localdate(), **current), current, previous
+
+
+def overview_data(latest, current, previous):
+    """AnalyticsOverviewSerializer data from a SystemStats row and this and last month's new rows"""
+    users_last_month = previous['new_users']
+    certificates_last_month = previous['new_certificates']
+    certificates_this_month = current['new_certificates']
+    user_growth_rate = (
+        (latest.total_users - users_last_month) / users_last_month * 100 if users_last_month > 0 else 0
+    )
+    certificate_growth_rate = (
+        (certificates_this_month - certificates_last_month) / certificates_last_month * 100
+        if certificates_last_month > 0 else 0
+    )
+    return {
+        'date': latest.date,
+        'total_users': latest.total_users,
+        'active_users': latest.active_users,
+        'students_count': latest.students_count,
+        'organizations_count': latest.organizations_count,
+        'admins_count': latest.admins_count,
+        'total_certificates': latest.total_certificates,
+        'verified_certificates': latest.verified_certificates,
+        'pending_certificates': latest.pending_certificates,
+        'certificates_this_month': certificates_this_month,
+        'total_verifications': latest.total_verifications,
+        'successful_verifications': latest.successful_verifications,
+        'verification_success_rate': success_rate(latest.successful_verifications, latest.total_verifications),
+        'verifications_this_month': current['new_verifications'],
+        'user_growth_rate': round(user_growth_rate, 2),
+        'certificate_growth_rate': round(certificate_growth_rate, 2),
+    }
+
+
+def truncate(value, granularity):
+    """Python counterpart of the Trunc functions for a local datetime"""
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if granularity != 'hour':
+        value = value.replace(hour=0)
+    if granularity == 'week':
+        value -= timedelta(days=value.weekday())
+    if granularity == 'month':
+        value = value.replace(day=1)
+    return value
+
+
+def _parse_bound(value, name):
+    try:
+        parsed_date = parse_date(value)
+        parsed = None if parsed_date else parse_datetime(value)
+    except ValueError:
+        parsed_date = parsed = None
+    if parsed_date is not None:
+        parsed = datetime.combine(parsed_date, time.min)
+        if name == 'date_to':
+            # A plain date_to includes the whole day
+            parsed += timedelta(days=1)
+    elif parsed is None:
+        raise ValidationError({name: 'Sana formati noto\'g\'ri (YYYY-MM-DD)'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def series_range(params, default_granularity, default_buckets):
+    """Read granularity, date_from and date_to query params.
+
+    Without a range the last ``default_buckets`` buckets up to now are used.
+    """
+    granularity = params.get('granularity', default_granularity)
+    if granularity not in GRANULARITIES:
+        raise ValidationError({'granularity': f"Quyidagilardan biri bo'lishi kerak: {', '.join(GRANULARITIES)}"})
+    step = GRANULARITIES[granularity][1]
+
+    now = timezone.localtime()
+    end = _parse_bound(params['date_to'], 'date_to') if params.get('date_to') else now
+    if params.get('date_from'):
+        start = _parse_bound(params['date_from'], 'date_from')
+    else:
+        start = truncate(timezone.localtime(end), granularity) - step * (default_buckets - 1)
+
+    if start >= end:
+        raise ValidationError({'date_from': 'date_from date_to dan oldin bo\'lishi kerak'})
+    return granularity, start, end
+
+
+def time_series(queryset, date_field, granularity, start, end, **counts):
+    """Dense, zero-filled counters per calendar bucket in a single GROUP BY query.
+
+    Buckets follow the current time zone (TIME_ZONE), so months are real
+    calendar months. ``counts`` are aggregate expressions, e.g.
+    ``total=Count('id')``.
+    """
+    trunc, step, label_format = GRANULARITIES[granularity]
+    tz = timezone.get_current_timezone()
+    first = truncate(timezone.localtime(start, tz), granularity)
+
+    buckets = []
+    bucket = first
+    while bucket < end:
+        buckets.append(bucket)
+        bucket += step
+        if len(buckets) > MAX_BUCKETS:
+            raise ValidationError({'granularity': f'Oraliq {MAX_BUCKETS} tadan ortiq nuqtaga bo\'linmaydi'})
+
+    rows = (
+        queryset
+        .filter(**{f'{date_field}__gte': first, f'{date_field}__lt': end})
+        .annotate(bucket=trunc(date_field, tzinfo=tz))
+        .values('bucket')
+        .annotate(**counts)
+        .order_by('bucket')
+    )
+    by_bucket = {row.pop('bucket'): row for row in rows}
+    empty = dict.fromkeys(counts, 0)
+
+    return [
+        {'period': bucket.strftime(label_format), **by_bucket.get(bucket, empty)}
+        for bucket in buckets
+    ]
@@ -0,0 +1,85 @@
+from datetime import datetime, time, timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from certificates.models import Certificate
+from verification.models import VerificationRequest
+from .models import DashboardStats, SystemStats
+from .services import materialize_dashboard_stats, system_counts
+
+User = get_user_model()
+
+DASHBOARD_WATERMARK_KEY = 'analytics:dashboard-stats:watermark'
+
+
+@shared_task
+def rollup_system_stats(day=None):
+    """Write the SystemStats row of a local calendar day (yesterday by default)"""
+    day = parse_date(day) if day else timezone.localdate() - timedelta(days=1)
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = start + timedelta(days=1)
+
+    SystemStats.objects.update_or_create(
+        date=day,
+        defaults=system_counts(start, end)
+    )
+
+    # Nightly full refresh picks up deletions and the monthly counter reset
+    refresh_all_dashboard_stats()
+    return str(day)
+
+
+def refresh_all_dashboard_stats():
+    users = User.objects.filter(dashboard_stats__isnull=False)
+    for user in users.iterator():
+        materialize_dashboard_stats(user)
+
+
+@shared_task
+def refresh_dashboard_stats():
+    """Recompute DashboardStats only for users touched since the last run.
+
+    Deltas are found from Certificate.updated_at and
+    VerificationRequest.verification_date, so rows written by bulk_create
+    (audit batches, bulk imports) are picked up as well. Only users that
+    already have a materialized row are refreshed; others are materialized
+    on their first dashboard request.
+    """
+    now = timezone.now()
+    watermark = cache.get(DASHBOARD_WATERMARK_KEY)
+    if watermark is None:
+        refresh_all_dashboard_stats()
+        cache.set(DASHBOARD_WATERMARK_KEY, now, timeout=None)
+        return 'full'
+
+    # Overlap covers audit records written a little after their verification_date
+    since = watermark - timedelta(seconds=settings.DASHBOARD_STATS_DELTA_OVERLAP)
+    user_ids = set()
+    for holder_id, issuer_id in Certificate.objects.filter(updated_at__gte=since).values_list(
+        'holder_id', 'issuer_id'
+    ).distinct():
+        user_ids.update((holder_id, issuer_id))
+    for holder_id, issuer_id in VerificationRequest.objects.filter(verification_date__gte=since).values_list(
+        'certificate__holder_id', 'certificate__issuer_id'
+    ).distinct():
+        user_ids.update((holder_id, issuer_id))
+
+    refreshed = 0
+    if user_ids:
+        # Superadmin dashboards are system-wide, so any change affects them
+        users = User.objects.filter(
+            Q(id__in=user_ids) | Q(role='superadmin'),
+            dashboard_stats__isnull=False
+        )
+        for user in users.iterator():
+            materialize_dashboard_stats(user)
+            refreshed += 1
+
+    cache.set(DASHBOARD_WATERMARK_KEY, now, timeout=None)
+    return refreshed
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.models import DashboardStats, SystemStats
+from analytics.tasks import rollup_system_stats
+from certifynow.testing import TEST_CACHES, create_certificate, create_user
+
+
+@override_settings(CACHES=TEST_CACHES, QR_CODE_SYNC=False)
+class AnalyticsRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.superadmin = create_user('superadmin')
+        self.holder = create_user('student')
+        self.issuer = create_user('admin')
+        create_certificate(self.holder, self.issuer)
+        create_certificate(self.holder, self.issuer, status='draft')
+        self.client = APIClient()
+        self.client.force_authenticate(self.superadmin)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_overview_is_served_from_the_latest_rollup(self):
+        SystemStats.objects.create(date=timezone.localdate(), total_users=123, total_certificates=456)
+        with self.assertNumQueries(3):
+            data = self.get('/api/v1/analytics/overview/')
+        self.assertEqual((data['total_users'], data['total_certificates']), (123, 456))
+        self.assertEqual(data['date'], str(timezone.localdate()))
+
+    def test_rollup_matches_the_live_overview(self):
+        live = self.get('/api/v1/analytics/overview/?fresh=1')
+        rollup_system_stats(str(timezone.localdate()))
+        self.assertEqual(self.get('/api/v1/analytics/overview/'), live)
+        self.assertEqual(
+            (live['total_users'], live['total_certificates'], live['pending_certificates']), (3, 2, 1)
+        )
+
+    def test_fresh_requests_write_nothing(self):
+        self.get('/api/v1/analytics/overview/?fresh=1')
+        data = self.get('/api/v1/analytics/dashboard/?fresh=1')
+        self.assertEqual(data['total_certificates'], 2)
+        self.assertFalse(SystemStats.objects.exists())
+        self.assertFalse(DashboardStats.objects.exists())
+
+    def test_non_admins_cannot_see_the_overview(self):
+        self.client.force_authenticate(self.issuer)
+        self.assertEqual(self.client.get('/api/v1/analytics/overview/').status_code, 403)
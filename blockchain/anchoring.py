@@ -0,0 +1,263 @@
+"""
+Batch anchoring of certificate hashes.
+
+Every issued certificate gets one pending ``certificate_issue`` transaction
+that carries its blockchain_hash, queued once the certificate is committed
+(queue_certificate_anchors backfills any that were missed). The block
+builder takes up to BLOCKCHAIN_BLOCK_MAX_TRANSACTIONS pending transactions,
+builds a Merkle tree over them and writes a single BlockchainBlock holding
+the root, chained to the previous block through parent_hash. Each
+transaction is then assigned to the block together with its leaf index and
+Merkle inclusion proof, so a certificate can later be proven part of the
+block from one row.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+
+from blockchain.merkle import EMPTY_ROOT, inclusion_proof, leaf_hash, merkle_levels, proof_steps
+from blockchain.models import BlockchainBlock, BlockchainTransaction
+from blockchain.signals import transactions_confirmed
+from certificates.models import Certificate
+
+GENESIS_PARENT_HASH = '0x' + '0' * 64
+HEAD_BLOCK_KEY = 'blockchain:head-block'
+CONFIRMED_HEAD_KEY = 'blockchain:confirmed-head-block'
+ANCHOR_BACKFILL_KEY = 'blockchain:anchor-backfill'
+
+
+def _hex_bytes(value):
+    value = value[2:] if value.startswith('0x') else value
+    try:
+        return bytes.fromhex(value)
+    except ValueError:
+        return value.encode()
+
+
+def transaction_leaf(blockchain_transaction):
+    """Merkle leaf of a transaction: the anchored certificate hash, else the transaction hash"""
+    data = blockchain_transaction.transaction_data.get('certificate_hash') or blockchain_transaction.transaction_hash
+    return leaf_hash(_hex_bytes(data))
+
+
+def anchor_transaction(certificate_pk, certificate_id, blockchain_hash):
+    """Unsaved pending certificate_issue transaction anchoring a certificate's hash"""
+    blockchain_transaction = BlockchainTransaction(
+        certificate_id=certificate_pk,
+        transaction_type='certificate_issue',
+        from_address=settings.BLOCKCHAIN_CONTRACT_ADDRESS,
+        to_address=settings.BLOCKCHAIN_CONTRACT_ADDRESS,
+        transaction_data={
+            'certificate_id': certificate_id,
+            'certificate_hash': blockchain_hash,
+        },
+    )
+    # bulk_create skips save(), which normally fills the hash
+    blockchain_transaction.transaction_hash = blockchain_transaction.generate_transaction_hash()
+    return blockchain_transaction
+
+
+def queue_anchors(certificates):
+    """Create pending certificate_issue transactions for (pk, certificate_id, blockchain_hash) triples"""
+    pending = [anchor_transaction(*certificate) for certificate in certificates]
+    # Certificates that already have one are skipped by unique_certificate_issue_transaction
+    BlockchainTransaction.objects.bulk_create(
+        pending, batch_size=settings.BLOCKCHAIN_BLOCK_MAX_TRANSACTIONS, ignore_conflicts=True
+    )
+    return len(pending)
+
+
+def queue_certificate_anchors(limit=None):
+    """Backfill anchors of issued certificates that have none, ``limit`` certificates per call.
+
+    Certificates queue their own anchor when they are issued; this only
+    catches the ones whose on_commit hook never ran. Each call checks the
+    next ``limit`` certificates in primary key order after a watermark kept
+    in the cache, and starts over once it reaches the end of the table.
+    """
+    limit = limit or settings.BLOCKCHAIN_ANCHOR_BACKFILL_BATCH
+    watermark = cache.get(ANCHOR_BACKFILL_KEY)
+    certificates = Certificate.objects.order_by('pk')
+    if watermark:
+        certificates = certificates.filter(pk__gt=watermark)
+    batch = list(certificates.values_list('pk', flat=True)[:limit])
+    cache.set(ANCHOR_BACKFILL_KEY, str(batch[-1]) if len(batch) == limit else None, timeout=None)
+    if not batch:
+        return 0
+
+    anchored = BlockchainTransaction.objects.filter(
+        certificate=OuterRef('pk'), transaction_type='certificate_issue'
+    )
+    missing = Certificate.objects.filter(
+        pk__in=batch, status__in=Certificate.ANCHORED_STATUSES
+    ).exclude(blockchain_hash='').filter(~Exists(anchored)).values_list('pk', 'certificate_id', 'blockchain_hash')
+    return queue_anchors(missing)
+
+
+def block_hash(block_number, parent_hash, transactions_root, timestamp):
+    header = {
+        'block_number': block_number,
+        'parent_hash': parent_hash,
+        'transactions_root': transactions_root,
+        'timestamp': timestamp.isoformat(),
+    }
+    return '0x' + hashlib.sha256(json.dumps(header, sort_keys=True).encode()).hexdigest()
+
+
+@transaction.atomic
+def build_block(heartbeat=False):
+    """Anchor the oldest unblocked pending transactions in a new block; returns it, or None.
+
+    With ``heartbeat`` the block is written even when nothing is pending, so
+    the chain, and the confirmations counted against it, keeps moving.
+    """
+    pending = list(
+        BlockchainTransaction.objects.select_for_update(skip_locked=True).filter(
+            status='pending', block_number__isnull=True
+        ).order_by('created_at', 'id').only(
+            'id', 'transaction_hash', 'transaction_data', 'gas_used'
+        )[:settings.BLOCKCHAIN_BLOCK_MAX_TRANSACTIONS]
+    )
+    if not pending and not heartbeat:
+        return None
+
+    parent = BlockchainBlock.objects.select_for_update().order_by('-block_number').first()
+    block_number = parent.block_number + 1 if parent else 0
+    parent_hash = parent.block_hash if parent else GENESIS_PARENT_HASH
+    timestamp = timezone.now()
+    levels = merkle_levels([transaction_leaf(tx) for tx in pending]) if pending else [[EMPTY_ROOT]]
+    transactions_root = '0x' + levels[-1][0].hex()
+
+    block = BlockchainBlock.objects.create(
+        block_number=block_number,
+        block_hash=block_hash(block_number, parent_hash, transactions_root, timestamp),
+        parent_hash=parent_hash,
+        timestamp=timestamp,
+        miner=settings.BLOCKCHAIN_CONTRACT_ADDRESS,
+        gas_used=sum(tx.gas_used for tx in pending),
+        transaction_count=len(pending),
+        transactions_root=transactions_root,
+    )
+    for index, blockchain_transaction in enumerate(pending):
+        blockchain_transaction.block_number = block.block_number
+        blockchain_transaction.block_hash = block.block_hash
+        blockchain_transaction.block_index = index
+        blockchain_transaction.merkle_proof = inclusion_proof(levels, index)
+    BlockchainTransaction.objects.bulk_update(
+        pending, ['block_number', 'block_hash', 'block_index', 'merkle_proof'], batch_size=500
+    )
+
+    anchored = [
+        (tx.transaction_data.get('certificate_id'), tx.transaction_data.get('certificate_hash'))
+        for tx in pending
+    ]
+    transaction.on_commit(lambda: _block_committed(block.block_number, anchored))
+    return block
+
+
+def _block_committed(block_number, anchored):
+    from verification.cache import invalidate_verification_keys
+    cache.set(HEAD_BLOCK_KEY, block_number, timeout=None)
+    # Cached verification payloads were built before these certificates had a proof
+    invalidate_verification_keys(anchored)
+
+
+def head_block_number():
+    """Number of the latest block, or None before the first one"""
+    number = cache.get(HEAD_BLOCK_KEY)
+    if number is None:
+        number = BlockchainBlock.objects.order_by('-block_number').values_list('block_number', flat=True).first()
+        if number is not None:
+            cache.set(HEAD_BLOCK_KEY, number, timeout=None)
+    return number
+
+
+def certificate_anchor(certificate):
+    """Block and Merkle inclusion proof of a certificate's issue transaction, or None if not yet anchored"""
+    return certificate_anchors([certificate.pk]).get(certificate.pk)
+
+
+def certificate_anchors(certificate_pks):
+    """certificate_anchor of several certificates with one query, as {certificate pk: anchor}"""
+    blocks = BlockchainBlock.objects.filter(block_number=OuterRef('block_number'))
+    transactions = BlockchainTransaction.objects.filter(
+        certificate__in=certificate_pks, transaction_type='certificate_issue', block_number__isnull=False
+    ).annotate(
+        transactions_root=Subquery(blocks.values('transactions_root')[:1]),
+        leaf_count=Subquery(blocks.values('transaction_count')[:1]),
+    ).only(
+        'certificate_id', 'transaction_hash', 'transaction_data', 'block_number', 'block_hash',
+        'block_index', 'merkle_proof', 'gas_used'
+    ).order_by('block_number')
+
+    anchors = {}
+    for anchor in transactions:
+        # The first block a certificate was anchored in
+        if anchor.certificate_id not in anchors:
+            anchors[anchor.certificate_id] = _anchor_data(anchor)
+    return anchors
+
+
+def _anchor_data(anchor):
+    return {
+        'transaction_hash': anchor.transaction_hash,
+        'block_number': anchor.block_number,
+        'block_hash': anchor.block_hash,
+        'gas_used': anchor.gas_used,
+        'merkle_proof': {
+            'leaf': '0x' + transaction_leaf(anchor).hex(),
+            'leaf_index': anchor.block_index,
+            'leaf_count': anchor.leaf_count,
+            'transactions_root': anchor.transactions_root,
+            'path': [
+                {'hash': '0x' + sibling.hex(), 'position': position}
+                for sibling, position in proof_steps(bytes(anchor.merkle_proof), anchor.block_index, anchor.leaf_count)
+            ],
+        },
+    }
+
+
+def awaiting_confirmations():
+    """Whether any blocked transaction still waits for confirmations"""
+    return BlockchainTransaction.objects.filter(status='pending', block_number__isnull=False).exists()
+
+
+@transaction.atomic
+def advance_confirmations():
+    """Recount confirmations of every pending blocked transaction against the head block.
+
+    The transactions that reach required_confirmations are selected (and
+    locked) first; one UPDATE then recounts all of them and marks those
+    confirmed. Returns the number of newly confirmed transactions and sends
+    ``transactions_confirmed`` for them.
+    """
+    head = BlockchainBlock.objects.order_by('-block_number').values_list('block_number', flat=True).first()
+    if head is None or cache.get(CONFIRMED_HEAD_KEY) == head:
+        return 0
+
+    now = timezone.now()
+    confirmations = Value(head + 1) - F('block_number')
+    reached = Q(required_confirmations__lte=confirmations)
+    unconfirmed = BlockchainTransaction.objects.filter(
+        status='pending', block_number__isnull=False, block_number__lte=head
+    )
+    confirmed = list(
+        unconfirmed.select_for_update().filter(reached).order_by('pk').values_list('id', 'certificate_id')
+    )
+    unconfirmed.update(
+        confirmations=confirmations,
+        status=Case(When(reached, then=Value('confirmed')), default=Value('pending')),
+        confirmed_at=Case(When(reached, then=Value(now)), default=None),
+    )
+
+    transaction.on_commit(lambda: cache.set(CONFIRMED_HEAD_KEY, head, timeout=None))
+    if confirmed:
+        transaction.on_commit(lambda: transactions_confirmed.send(
+            sender=BlockchainTransaction, transactions=confirmed, head_block=head
+        ))
+    return len(confirmed)
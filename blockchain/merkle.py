@@ -0,0 +1,90 @@
+"""
+Merkle trees over SHA-256.
+
+Leaves and inner nodes are hashed with different prefixes (0x00 / 0x01) so a
+leaf can never be passed off as an inner node. A node without a sibling is
+carried up to the next level unchanged instead of being paired with itself.
+
+Inclusion proofs are the concatenated sibling hashes from a leaf to the root;
+together with the leaf index and the leaf count they are enough to recompute
+the root, in O(log n) hashes.
+"""
+import hashlib
+
+HASH_SIZE = hashlib.sha256().digest_size
+# Root of a block without transactions
+EMPTY_ROOT = hashlib.sha256(b'').digest()
+
+
+def leaf_hash(data):
+    return hashlib.sha256(b'\x00' + data).digest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+
+def merkle_levels(leaves):
+    """All levels of the tree, from the leaf hashes up to [root]"""
+    if not leaves:
+        raise ValueError('Merkle tree needs at least one leaf')
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def merkle_root(leaves):
+    return merkle_levels(leaves)[-1][0]
+
+
+def _path(index, leaf_count):
+    """(level, sibling index or None, sibling is on the left) for each level below the root"""
+    level = 0
+    while leaf_count > 1:
+        if index % 2:
+            yield level, index - 1, True
+        elif index + 1 < leaf_count:
+            yield level, index + 1, False
+        else:
+            yield level, None, False
+        index //= 2
+        leaf_count = (leaf_count + 1) // 2
+        level += 1
+
+
+def inclusion_proof(levels, index):
+    """Sibling hashes from leaf ``index`` up to the root, packed into one bytes value.
+
+    Levels where the node is carried up have no sibling and add nothing; the
+    sides follow from the index and the leaf count, so they are not stored.
+    """
+    return b''.join(
+        levels[level][sibling]
+        for level, sibling, _ in _path(index, len(levels[0]))
+        if sibling is not None
+    )
+
+
+def proof_steps(proof, index, leaf_count):
+    """Unpack an inclusion proof into [(sibling hash, 'left' | 'right')]"""
+    siblings = [proof[i:i + HASH_SIZE] for i in range(0, len(proof), HASH_SIZE)]
+    sides = [
+        'left' if on_left else 'right'
+        for _, sibling, on_left in _path(index, leaf_count)
+        if sibling is not None
+    ]
+    if len(siblings) != len(sides):
+        raise ValueError('Merkle proof does not match the leaf position')
+    return list(zip(siblings, sides))
+
+
+def verify_proof(leaf, proof, index, leaf_count, root):
+    node = leaf
+    for sibling, side in proof_steps(proof, index, leaf_count):
+        node = node_hash(sibling, node) if side == 'left' else node_hash(node, sibling)
+    return node == root
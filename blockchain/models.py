@@ -29,6 +29,10 @@ class BlockchainTransaction(models.Model):
     block_number = models.BigIntegerField(_('Blok raqami'), null=True, blank=True)
     block_hash = models.CharField(_('Blok hash'), max_length=66, blank=True)
     
+    # Merkle inclusion proof: leaf position in the block and the packed sibling hashes
+    block_index = models.PositiveIntegerField(_('Blokdagi o\'rni'), null=True, blank=True)
+    merkle_proof = models.BinaryField(_('Merkle isboti'), blank=True, default=b'')
+    
     # Transaction details
     transaction_type = models.CharField(_('Tranzaksiya turi'), max_length=30, choices=TRANSACTION_TYPES)
     from_address = models.CharField(_('Yuboruvchi manzil'), max_length=42)
@@ -62,6 +66,20 @@ class BlockchainTransaction(models.Model):
             models.Index(fields=['transaction_hash']),
             models.Index(fields=['certificate', 'status']),
             models.Index(fields=['block_number']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['status', 'confirmed_at']),
+            # Rows the confirmation tracker advances
+            models.Index(
+                fields=['block_number'], condition=models.Q(status='pending', block_number__isnull=False),
+                name='blockchain_tx_unconfirmed_idx'
+            ),
+        ]
+        constraints = [
+            # A certificate is anchored once, whether on issue or by the backfill
+            models.UniqueConstraint(
+                fields=['certificate'], condition=models.Q(transaction_type='certificate_issue'),
+                name='unique_certificate_issue_transaction'
+            ),
         ]
     
     def __str__(self):
@@ -75,7 +93,7 @@ class BlockchainTransaction(models.Model):
     def generate_transaction_hash(self):
         """Generate a mock transaction hash"""
         data = {
-            'certificate_id': str(self.certificate.id),
+            'certificate_id': str(self.certificate_id),
             'transaction_type': self.transaction_type,
             'from_address': self.from_address,
             'timestamp': datetime.now().isoformat(),
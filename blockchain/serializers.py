@@ -7,7 +7,8 @@ class BlockchainTransactionSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = BlockchainTransaction
-        fields = '__all__'
+        # The packed proof is exposed through certificate verification instead
+        exclude = ['merkle_proof']
         read_only_fields = [
             'id', 'transaction_hash', 'block_number', 'block_hash',
             'created_at', 'confirmed_at', 'confirmations'
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent once per confirmation tick with ``transactions``, a list of
+# (transaction id, certificate id) pairs that reached their required
+# confirmations, and ``head_block``, the block number they were counted at.
+transactions_confirmed = Signal()
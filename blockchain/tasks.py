@@ -0,0 +1,32 @@
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+
+from blockchain import anchoring
+
+BLOCK_BUILDER_LOCK = 'blockchain:block-builder'
+
+
+@shared_task
+def build_blocks():
+    """Backfill missed certificate anchors and pack pending transactions into blocks"""
+    if not cache.add(BLOCK_BUILDER_LOCK, True, timeout=settings.BLOCKCHAIN_BLOCK_INTERVAL * 10):
+        return 0
+    try:
+        anchoring.queue_certificate_anchors()
+        blocks = 0
+        while anchoring.build_block() is not None:
+            blocks += 1
+        if not blocks and anchoring.awaiting_confirmations():
+            # Confirmations are counted in blocks; keep them coming while nothing is issued
+            anchoring.build_block(heartbeat=True)
+            blocks = 1
+        return blocks
+    finally:
+        cache.delete(BLOCK_BUILDER_LOCK)
+
+
+@shared_task
+def advance_confirmations():
+    """Advance confirmations of pending transactions to the current head block"""
+    return anchoring.advance_confirmations()
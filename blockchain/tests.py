@@ -0,0 +1,208 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blockchain.anchoring import advance_confirmations, build_block, certificate_anchor, queue_certificate_anchors
+from blockchain.merkle import (
+    HASH_SIZE, inclusion_proof, leaf_hash, merkle_levels, merkle_root, node_hash, proof_steps, verify_proof
+)
+from blockchain.models import BlockchainBlock, BlockchainTransaction
+from blockchain.signals import transactions_confirmed
+from blockchain.tasks import build_blocks
+from certifynow.testing import TEST_CACHES, create_certificate, create_user
+
+
+class MerkleTests(SimpleTestCase):
+    def leaves(self, count):
+        return [leaf_hash(str(index).encode()) for index in range(count)]
+
+    def test_single_leaf_is_the_root(self):
+        leaves = self.leaves(1)
+        self.assertEqual(merkle_root(leaves), leaves[0])
+        self.assertEqual(inclusion_proof(merkle_levels(leaves), 0), b'')
+
+    def test_odd_node_is_carried_up(self):
+        a, b, c = self.leaves(3)
+        self.assertEqual(merkle_root([a, b, c]), node_hash(node_hash(a, b), c))
+
+    def test_every_proof_verifies(self):
+        for count in range(1, 18):
+            leaves = self.leaves(count)
+            levels = merkle_levels(leaves)
+            root = levels[-1][0]
+            for index, leaf in enumerate(leaves):
+                with self.subTest(count=count, index=index):
+                    proof = inclusion_proof(levels, index)
+                    self.assertEqual(len(proof) % HASH_SIZE, 0)
+                    self.assertTrue(verify_proof(leaf, proof, index, count, root))
+
+    def test_proof_does_not_verify_another_leaf_or_position(self):
+        leaves = self.leaves(5)
+        levels = merkle_levels(leaves)
+        root = levels[-1][0]
+        proof = inclusion_proof(levels, 1)
+        self.assertFalse(verify_proof(leaves[2], proof, 1, 5, root))
+        self.assertFalse(verify_proof(leaves[1], proof, 0, 5, root))
+        tampered = bytes([proof[0] ^ 1]) + proof[1:]
+        self.assertFalse(verify_proof(leaves[1], tampered, 1, 5, root))
+
+    def test_leaf_cannot_pose_as_an_inner_node(self):
+        a, b = self.leaves(2)
+        self.assertNotEqual(leaf_hash(a + b), node_hash(a, b))
+
+    def test_proof_of_the_wrong_length_is_rejected(self):
+        levels = merkle_levels(self.leaves(4))
+        with self.assertRaises(ValueError):
+            proof_steps(inclusion_proof(levels, 0)[HASH_SIZE:], 0, 4)
+        with self.assertRaises(ValueError):
+            merkle_levels([])
+
+
+@override_settings(CACHES=TEST_CACHES, QR_CODE_SYNC=False, BLOCKCHAIN_BLOCK_MAX_TRANSACTIONS=4)
+class BlockBuilderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.holder = create_user('student')
+        self.issuer = create_user('admin')
+
+    def test_anchors_carry_proofs_to_the_block_root(self):
+        certificates = [create_certificate(self.holder, self.issuer) for _ in range(6)]
+        self.assertEqual(queue_certificate_anchors(), 6)
+
+        first, second = build_block(), build_block()
+        self.assertIsNone(build_block())
+        self.assertEqual((first.transaction_count, second.transaction_count), (4, 2))
+        self.assertEqual(second.parent_hash, first.block_hash)
+
+        blocks = {first.block_number: first, second.block_number: second}
+        for certificate in certificates:
+            with self.subTest(certificate=certificate.certificate_id):
+                anchor = certificate_anchor(certificate)
+                proof = anchor['merkle_proof']
+                block = blocks[anchor['block_number']]
+                self.assertEqual(proof['transactions_root'], block.transactions_root)
+                self.assertEqual(proof['leaf_count'], block.transaction_count)
+
+                node = bytes.fromhex(proof['leaf'][2:])
+                for step in proof['path']:
+                    sibling = bytes.fromhex(step['hash'][2:])
+                    node = node_hash(sibling, node) if step['position'] == 'left' else node_hash(node, sibling)
+                self.assertEqual('0x' + node.hex(), block.transactions_root)
+
+    @mock.patch('certificates.tasks.generate_certificate_qr.delay')
+    def test_certificates_are_anchored_on_issue(self, generate_qr):
+        with self.captureOnCommitCallbacks(execute=True):
+            issued = create_certificate(self.holder, self.issuer)
+            draft = create_certificate(self.holder, self.issuer, status='draft')
+        self.assertEqual(list(BlockchainTransaction.objects.values_list('certificate', flat=True)), [issued.pk])
+
+        draft.status = 'issued'
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.save()
+        self.assertEqual(BlockchainTransaction.objects.filter(certificate=draft).count(), 1)
+        self.assertEqual(queue_certificate_anchors(), 0)
+
+    def test_backfill_walks_the_table_in_batches(self):
+        for _ in range(5):
+            create_certificate(self.holder, self.issuer)
+        self.assertEqual([queue_certificate_anchors(limit=2) for _ in range(4)], [2, 2, 1, 0])
+        self.assertEqual(BlockchainTransaction.objects.count(), 5)
+
+
+    def test_heartbeat_blocks_confirm_waiting_transactions(self):
+        create_certificate(self.holder, self.issuer)
+        build_blocks()
+        BlockchainTransaction.objects.update(required_confirmations=3)
+        self.assertEqual(advance_confirmations(), 0)
+
+        received = []
+
+        def receiver(transactions, **kwargs):
+            received.append(transactions)
+
+        transactions_confirmed.connect(receiver)
+        self.addCleanup(transactions_confirmed.disconnect, receiver)
+        self.assertEqual([build_blocks(), build_blocks()], [1, 1])
+        self.assertEqual(BlockchainBlock.objects.filter(transaction_count=0).count(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(advance_confirmations(), 1)
+
+        blockchain_transaction = BlockchainTransaction.objects.get()
+        self.assertEqual((blockchain_transaction.status, blockchain_transaction.confirmations), ('confirmed', 3))
+        self.assertEqual(received, [[(blockchain_transaction.pk, blockchain_transaction.certificate_id)]])
+        # Nothing waits any more, so no more empty blocks
+        self.assertEqual(build_blocks(), 0)
+
+
+@override_settings(CACHES=TEST_CACHES, QR_CODE_SYNC=False)
+class TransactionListTests(TestCase):
+    url = '/api/v1/blockchain/transactions/'
+
+    def setUp(self):
+        cache.clear()
+        self.holder = create_user('student')
+        self.issuer = create_user('admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.holder)
+        certificate = create_certificate(self.holder, self.issuer)
+        self.transactions = [
+            BlockchainTransaction.objects.create(
+                certificate=certificate, transaction_type='certificate_verify', from_address='0x0'
+            )
+            for _ in range(10)
+        ]
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.get(f'{self.url}?page_size=2')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.get(f'{self.url}?page_size=2')['results']), 2)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(len(self.get(f'{self.url}?page_size=10')['results']), 10)
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            page = self.get(url)
+            pages.append([row['id'] for row in page['results']])
+            url = page[link]
+        return pages
+
+    def test_cursors_walk_every_row_once_in_both_directions(self):
+        # Equal timestamps leave the order to the id tie breaker
+        created_at = timezone.now() - timedelta(days=1)
+        BlockchainTransaction.objects.filter(pk__in=[tx.pk for tx in self.transactions[3:7]]).update(
+            created_at=created_at
+        )
+        expected = [
+            str(pk) for pk in
+            BlockchainTransaction.objects.order_by('-created_at', '-id').values_list('pk', flat=True)
+        ]
+
+        forward = self.walk(f'{self.url}?page_size=3', 'next')
+        self.assertEqual([len(page) for page in forward], [3, 3, 3, 1])
+        self.assertEqual(sum(forward, []), expected)
+
+        last = self.get(f'{self.url}?page_size=3')['next']
+        while (page := self.get(last))['next']:
+            last = page['next']
+        backward = self.walk(last, 'previous')
+        self.assertEqual(sum(reversed(backward), []), expected)
+
+    def test_count_is_opt_in(self):
+        self.assertNotIn('count', self.get(self.url))
+        self.assertEqual(self.get(f'{self.url}?count=exact')['count'], 10)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(f'{self.url}?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
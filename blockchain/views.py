@@ -3,6 +3,8 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.db.models import Count, Sum
+from accounts.access import get_access_scope
+from certifynow.pagination import KeysetPagination
 from .models import BlockchainTransaction, BlockchainBlock, SmartContract
 from .serializers import (
     BlockchainTransactionSerializer, BlockchainBlockSerializer,
@@ -20,16 +22,12 @@ class BlockchainTransactionListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['transaction_type', 'status', 'certificate']
     search_fields = ['transaction_hash', 'certificate__certificate_id']
-    ordering = ['-created_at']
+    # Newest first by (created_at, id) keyset
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'admin':
-            return BlockchainTransaction.objects.all()
-        elif user.role == 'organization':
-            return BlockchainTransaction.objects.filter(certificate__issuer=user)
-        else:
-            return BlockchainTransaction.objects.filter(certificate__holder=user)
+        scope = get_access_scope(self.request.user)
+        return BlockchainTransaction.objects.filter(scope.certificate_activity())
 
 @extend_schema(
     summary="Retrieve Transaction Details",
@@ -69,7 +67,7 @@ class BlockchainBlockListView(generics.ListAPIView):
 @permission_classes([permissions.IsAuthenticated])
 def blockchain_stats(request):
     """Get blockchain statistics"""
-    if request.user.role != 'admin':
+    if not get_access_scope(request.user).is_platform_admin:
         return Response(
             {'error': 'Faqat administratorlar bu ma\'lumotni ko\'ra oladi'},
             status=status.HTTP_403_FORBIDDEN
@@ -115,41 +113,6 @@ def blockchain_stats(request):
     
     return Response(stats)
 
-@extend_schema(
-    summary="Verify Transaction",
-    description="Verify and confirm a pending blockchain transaction by its hash.",
-    tags=["Blockchain"],
-    responses={
-        200: OpenApiResponse(description="Transaction successfully verified."),
-        404: OpenApiResponse(description="Transaction not found.")
-    }
-)
-
-@api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
-def verify_transaction(request, transaction_hash):
-    """Verify a blockchain transaction"""
-    try:
-        transaction = BlockchainTransaction.objects.get(transaction_hash=transaction_hash)
-        
-        # Mock verification process
-        if transaction.status == 'pending':
-            transaction.status = 'confirmed'
-            transaction.confirmations = 12
-            transaction.save()
-        
-        serializer = BlockchainTransactionSerializer(transaction)
-        return Response({
-            'message': 'Tranzaksiya tasdiqlandi',
-            'transaction': serializer.data
-        })
-        
-    except BlockchainTransaction.DoesNotExist:
-        return Response(
-            {'error': 'Tranzaksiya topilmadi'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-
 @extend_schema(
     summary="List Smart Contracts",
     description="Retrieve a list of active smart contracts filtered by type or verification status.",
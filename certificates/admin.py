@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Certificate, CertificateTemplate, CertificateVerification
+from .models import (
+    Certificate, CertificateTemplate, CertificateVerification, CertificateImportJob,
+    IntegritySweep, IntegrityMismatch,
+)
 
 
 @admin.register(Certificate)
@@ -41,3 +44,27 @@ class CertificateVerificationAdmin(admin.ModelAdmin):
     list_filter = ('is_valid', 'verification_date')
     search_fields = ('certificate__certificate_id', 'verifier_ip')
     readonly_fields = ('verification_date',)
+
+
+@admin.register(CertificateImportJob)
+class CertificateImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'issuer', 'file_format', 'status', 'processed_rows', 'created_count', 'error_count', 'created_at')
+    list_filter = ('status', 'file_format')
+    search_fields = ('issuer__email',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+    autocomplete_fields = ('issuer',)
+
+
+@admin.register(IntegritySweep)
+class IntegritySweepAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'checked_count', 'mismatch_count', 'started_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('started_at', 'finished_at', 'last_checked_id', 'checked_count', 'mismatch_count')
+
+
+@admin.register(IntegrityMismatch)
+class IntegrityMismatchAdmin(admin.ModelAdmin):
+    list_display = ('certificate', 'sweep', 'stored_hash', 'expected_hash', 'detected_at')
+    search_fields = ('certificate__certificate_id', 'stored_hash')
+    readonly_fields = ('detected_at',)
+    autocomplete_fields = ('certificate',)
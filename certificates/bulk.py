@@ -0,0 +1,89 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from blockchain.anchoring import queue_anchors
+from certificates.models import Certificate
+from certificates.serializers import CertificateCreateSerializer
+from verification.lookup_filter import add_certificates
+
+User = get_user_model()
+
+BULK_BATCH_SIZE = 500
+
+
+def _new_certificate_id():
+    return f"CERT-{uuid.uuid4().hex[:8].upper()}"
+
+
+def _unique_certificate_ids(count):
+    """Certificate IDs that are unique within the batch and not used yet"""
+    ids = {_new_certificate_id() for _ in range(count)}
+    while True:
+        taken = set(Certificate.objects.filter(certificate_id__in=ids).values_list('certificate_id', flat=True))
+        ids -= taken
+        if len(ids) >= count:
+            return list(ids)[:count]
+        ids.update(_new_certificate_id() for _ in range(count - len(ids)))
+
+
+def create_certificates(rows, issuer, first_row=1):
+    """Validate certificate rows and insert the valid ones with one bulk_create.
+
+    Holders are resolved with a single email IN query; certificate IDs and
+    blockchain hashes are computed in Python and QR codes are generated
+    after commit. Returns ``(created, errors)`` where ``created`` holds
+    ``{'row', 'id', 'certificate_id'}`` dicts and ``errors`` holds
+    ``{'row', 'errors'}`` dicts, with 1-based row numbers starting at
+    ``first_row``.
+    """
+    valid_rows = []
+    errors = []
+    for row_number, row in enumerate(rows, start=first_row):
+        serializer = CertificateCreateSerializer(data=row)
+        if serializer.is_valid():
+            valid_rows.append((row_number, serializer.validated_data))
+        else:
+            errors.append({'row': row_number, 'errors': serializer.errors})
+
+    emails = {data['holder_email'] for _, data in valid_rows}
+    holders = {user.email: user for user in User.objects.filter(email__in=emails)}
+
+    certificates = []
+    row_numbers = []
+    for row_number, data in valid_rows:
+        data = dict(data)
+        holder = holders.get(data.pop('holder_email'))
+        if holder is None:
+            errors.append({'row': row_number, 'errors': {'holder_email': ['Bunday email bilan foydalanuvchi topilmadi']}})
+            continue
+        certificates.append(Certificate(holder=holder, issuer=issuer, status='issued', **data))
+        row_numbers.append(row_number)
+
+    for certificate, certificate_id in zip(certificates, _unique_certificate_ids(len(certificates))):
+        certificate.certificate_id = certificate_id
+        certificate.blockchain_hash = certificate.generate_blockchain_hash()
+        if settings.QR_CODE_SYNC:
+            certificate.render_qr_code()
+
+    with transaction.atomic():
+        Certificate.objects.bulk_create(certificates, batch_size=BULK_BATCH_SIZE)
+        identifiers = [(certificate.certificate_id, certificate.blockchain_hash) for certificate in certificates]
+        transaction.on_commit(lambda: add_certificates(identifiers))
+        anchors = [
+            (certificate.pk, certificate.certificate_id, certificate.blockchain_hash) for certificate in certificates
+        ]
+        transaction.on_commit(lambda: queue_anchors(anchors), robust=True)
+        if not settings.QR_CODE_SYNC:
+            from certificates.tasks import generate_certificate_qrs
+            certificate_ids = [certificate.certificate_id for certificate in certificates]
+            transaction.on_commit(lambda: generate_certificate_qrs.delay(certificate_ids), robust=True)
+
+    created = [
+        {'row': row_number, 'id': str(certificate.id), 'certificate_id': certificate.certificate_id}
+        for row_number, certificate in zip(row_numbers, certificates)
+    ]
+    errors.sort(key=lambda error: error['row'])
+    return created, errors
@@ -0,0 +1,120 @@
+"""
+Canonical certificate hashes.
+
+A hash covers HASH_FIELDS of a certificate, read from one row: either an
+instance with holder and issuer loaded through select_related, or a
+``values()`` row with ``holder__email`` / ``issuer__email``. The functions
+working on plain tuples need no database or Django setup, so they can run
+in worker processes.
+
+Schemes are versioned. Version 1 is the original ``json.dumps`` payload and
+is stored as bare hex; later versions are stored as ``"<version>:<hex>"`` so
+an old hash is always checked with the scheme that produced it.
+``CERTIFICATE_HASH_VERSION`` selects the scheme for new certificates.
+"""
+import hashlib
+from json.encoder import encode_basestring_ascii
+
+from django.conf import settings
+
+HASH_FIELDS = ('certificate_id', 'holder__email', 'issuer__email', 'title', 'issue_date')
+
+
+def _digest_v1(certificate_id, holder_email, issuer_email, title, issue_date):
+    # Byte for byte what json.dumps(data, sort_keys=True) produced for these keys
+    payload = '{"certificate_id": %s, "holder_email": %s, "issue_date": %s, "issuer_email": %s, "title": %s}' % (
+        encode_basestring_ascii(certificate_id),
+        encode_basestring_ascii(holder_email),
+        encode_basestring_ascii(str(issue_date)),
+        encode_basestring_ascii(issuer_email),
+        encode_basestring_ascii(title),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _digest_v2(*values):
+    # Length-prefixed UTF-8 fields: unambiguous without any quoting
+    digest = hashlib.sha256()
+    for value in values:
+        encoded = str(value).encode()
+        digest.update(b'%d:' % len(encoded))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+SCHEMES = {
+    1: _digest_v1,
+    2: _digest_v2,
+}
+
+
+def hash_version(blockchain_hash):
+    """Scheme version a stored hash was made with"""
+    prefix, separator, _ = blockchain_hash.partition(':')
+    return int(prefix) if separator and prefix.isdigit() else 1
+
+
+def hash_row(values, version):
+    """Hash of HASH_FIELDS values, in that order"""
+    digest = SCHEMES[version](*values)
+    return digest if version == 1 else f'{version}:{digest}'
+
+
+def hash_values(certificate):
+    """HASH_FIELDS values of a Certificate instance"""
+    return (
+        certificate.certificate_id,
+        certificate.holder.email,
+        certificate.issuer.email,
+        certificate.title,
+        certificate.issue_date,
+    )
+
+
+def certificate_hash(values, version=None):
+    return hash_row(values, version or settings.CERTIFICATE_HASH_VERSION)
+
+
+def expected_hash(blockchain_hash, values):
+    """What the stored hash should be under the scheme that produced it; None for an unknown scheme"""
+    version = hash_version(blockchain_hash)
+    if version not in SCHEMES:
+        return None
+    return hash_row(values, version)
+
+
+def hash_matches(blockchain_hash, values):
+    """Whether a stored hash still matches the values"""
+    return bool(blockchain_hash) and expected_hash(blockchain_hash, values) == blockchain_hash
+
+
+def check_rows(rows):
+    """(pk, stored hash, *HASH_FIELDS) rows whose stored hash no longer matches, as (pk, stored, expected)"""
+    checked = []
+    for pk, blockchain_hash, *values in rows:
+        expected = expected_hash(blockchain_hash, values)
+        if not blockchain_hash or expected != blockchain_hash:
+            checked.append((pk, blockchain_hash, expected))
+    return checked
+
+
+def find_mismatches(rows):
+    """Primary keys of the rows check_rows reports"""
+    return [pk for pk, _, _ in check_rows(rows)]
+
+
+def hash_rows(queryset):
+    """values_list rows of a Certificate queryset in the shape find_mismatches expects"""
+    return queryset.values_list('pk', 'blockchain_hash', *HASH_FIELDS)
+
+
+def verify_hashes(ids, batch_size=2000):
+    """Re-hash the certificates with the given primary keys; returns the pks that do not match"""
+    from certificates.models import Certificate
+
+    ids = list(ids)
+    mismatches = []
+    for start in range(0, len(ids), batch_size):
+        rows = hash_rows(Certificate.objects.filter(pk__in=ids[start:start + batch_size]))
+        mismatches.extend(find_mismatches(rows))
+    return mismatches
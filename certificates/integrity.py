@@ -0,0 +1,120 @@
+"""
+Integrity sweeps: re-hash every certificate and record the ones whose stored
+blockchain_hash no longer matches.
+
+Rows are streamed in primary key order through a server-side cursor as plain
+values_list tuples and hashed in a process pool, a chunk per task. Chunks are
+committed in order, so ``IntegritySweep.last_checked_id`` always marks a point
+up to which everything has been checked and a sweep can be resumed from it.
+
+Celery workers cannot start process pools (their processes are daemonic), so
+the beat task splits the id space into partition sweeps and runs them as
+parallel subtasks, each hashing in-process.
+"""
+import logging
+import multiprocessing
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from certificates.hashing import check_rows, hash_rows
+from certificates.models import Certificate, IntegrityMismatch, IntegritySweep
+
+logger = logging.getLogger(__name__)
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def sweep_rows(sweep, chunk_size):
+    """Rows of the sweep's id range that have not been checked yet"""
+    certificates = Certificate.objects.all()
+    if sweep.last_checked_id:
+        certificates = certificates.filter(pk__gt=sweep.last_checked_id)
+    elif sweep.range_start:
+        certificates = certificates.filter(pk__gte=sweep.range_start)
+    if sweep.range_end:
+        certificates = certificates.filter(pk__lte=sweep.range_end)
+    return hash_rows(certificates.order_by('pk')).iterator(chunk_size=chunk_size)
+
+
+def _record_chunk(sweep, chunk, mismatches):
+    if mismatches:
+        IntegrityMismatch.objects.bulk_create([
+            IntegrityMismatch(sweep=sweep, certificate_id=pk, stored_hash=stored, expected_hash=expected or '')
+            for pk, stored, expected in mismatches
+        ], ignore_conflicts=True)
+        logger.warning('Integrity sweep %s: %d certificates with mismatching hashes', sweep.pk, len(mismatches))
+    sweep.last_checked_id = chunk[-1][0]
+    IntegritySweep.objects.filter(pk=sweep.pk).update(
+        last_checked_id=sweep.last_checked_id,
+        checked_count=F('checked_count') + len(chunk),
+        mismatch_count=F('mismatch_count') + len(mismatches),
+    )
+
+
+def _check_in_pool(sweep, chunks, workers):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded number of chunks in flight so memory stays flat
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append((chunk, pool.submit(check_rows, chunk)))
+            if len(in_flight) >= workers * 2:
+                done, future = in_flight.popleft()
+                _record_chunk(sweep, done, future.result())
+        while in_flight:
+            done, future = in_flight.popleft()
+            _record_chunk(sweep, done, future.result())
+
+
+def run_sweep(sweep, workers=None, chunk_size=None):
+    """Check the rest of a sweep's range with ``workers`` processes (all cores by default).
+
+    With one worker, or inside a daemonic process that cannot have children,
+    the chunks are hashed in the current process.
+    """
+    workers = workers or settings.INTEGRITY_SWEEP_WORKERS or os.cpu_count()
+    chunk_size = chunk_size or settings.INTEGRITY_SWEEP_CHUNK_SIZE
+    chunks = _chunks(sweep_rows(sweep, chunk_size), chunk_size)
+    if sweep.status != 'running':
+        IntegritySweep.objects.filter(pk=sweep.pk).update(status='running', error_message='', finished_at=None)
+
+    try:
+        if workers == 1 or multiprocessing.current_process().daemon:
+            for chunk in chunks:
+                _record_chunk(sweep, chunk, check_rows(chunk))
+        else:
+            _check_in_pool(sweep, chunks, workers)
+    except Exception as e:
+        IntegritySweep.objects.filter(pk=sweep.pk).update(status='failed', error_message=str(e))
+        raise
+
+    IntegritySweep.objects.filter(pk=sweep.pk).update(status='completed', finished_at=timezone.now())
+    sweep.refresh_from_db()
+    return sweep
+
+
+def resumable_sweep():
+    """The latest sweep that did not complete, if any"""
+    return IntegritySweep.objects.exclude(status='completed').order_by('-started_at').first()
+
+
+def create_partition_sweeps(partitions):
+    """Sweeps covering the whole UUID space in ``partitions`` contiguous id ranges"""
+    step = 2 ** 128 // partitions
+    bounds = [
+        (uuid.UUID(int=index * step), uuid.UUID(int=(index + 1) * step - 1 if index < partitions - 1 else 2 ** 128 - 1))
+        for index in range(partitions)
+    ]
+    return IntegritySweep.objects.bulk_create([
+        IntegritySweep(range_start=start, range_end=end) for start, end in bounds
+    ])
@@ -0,0 +1,124 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+from certificates.models import Certificate
+
+User = get_user_model()
+
+# (path, query parameters, roles) of the list, stats and dashboard endpoints,
+# each requested as a user of every listed role
+HOT_ENDPOINTS = [
+    ('/api/v1/certificates/', {}, ('admin', 'student', 'superadmin')),
+    ('/api/v1/certificates/stats/', {}, ('admin', 'student')),
+    ('/api/v1/verification/history/', {}, ('admin', 'student')),
+    ('/api/v1/verification/logs/', {}, ('admin', 'student')),
+    ('/api/v1/verification/stats/', {}, ('admin',)),
+    ('/api/v1/blockchain/transactions/', {}, ('admin', 'student')),
+    # fresh=1 computes the dashboard live instead of reading the materialized row
+    ('/api/v1/analytics/dashboard/', {'fresh': '1'}, ('admin', 'student', 'superadmin')),
+    # Trend queries group the raw tables by period on every request
+    ('/api/v1/analytics/certificates/', {}, ('admin', 'student', 'superadmin')),
+    ('/api/v1/analytics/verifications/', {}, ('admin', 'student', 'superadmin')),
+    ('/api/v1/analytics/overview/', {}, ('superadmin',)),
+    ('/api/v1/analytics/system-stats/', {}, ('superadmin',)),
+]
+
+
+def verification_lookups(certificate):
+    """Lookups the verification views run when the verification cache misses"""
+    certificates = Certificate.objects.select_related('holder', 'issuer')
+    return [
+        ('verify by id', certificates.filter(certificate_id=certificate.certificate_id)),
+        ('verify by hash', certificates.filter(blockchain_hash=certificate.blockchain_hash)),
+    ]
+
+
+def endpoint_queries(path, params, user):
+    """SELECT statements a GET of ``path`` runs for ``user``, with the response status"""
+    request = APIRequestFactory().get(path, params)
+    force_authenticate(request, user=user)
+    match = resolve(path)
+    with CaptureQueriesContext(connection) as queries:
+        response = match.func(request, *match.args, **match.kwargs)
+    statements = []
+    for query in queries.captured_queries:
+        sql = query['sql']
+        if sql.lstrip().upper().startswith('SELECT') and sql not in statements:
+            statements.append(sql)
+    return response.status_code, statements
+
+
+class Command(BaseCommand):
+    help = (
+        'Request the hot certificate, verification and analytics endpoints, run EXPLAIN for every query '
+        'they issue and fail on sequential scans'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+        parser.add_argument(
+            '--allow-seqscan', action='store_true',
+            help=(
+                'Plan with the default enable_seqscan. By default it is turned off, so that on small '
+                'seeded tables a sequential scan only shows up where no index path exists'
+            )
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN checks require PostgreSQL')
+
+        certificate = Certificate.objects.select_related('issuer', 'holder').first()
+        if certificate is None:
+            raise CommandError('No certificates found. Seed data first (make seed).')
+        users = {
+            'admin': certificate.issuer,
+            'student': certificate.holder,
+            'superadmin': User.objects.filter(role='superadmin', is_active=True).first(),
+        }
+
+        seq_scans = []
+        with transaction.atomic():
+            if not options['allow_seqscan']:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for label, queryset in verification_lookups(certificate):
+                self.check_plan(label, queryset.explain(), seq_scans, options)
+
+            for path, params, roles in HOT_ENDPOINTS:
+                for role in roles:
+                    if users[role] is None:
+                        self.stdout.write(self.style.WARNING(f'SKIPPED   {path} ({role}): no such user'))
+                        continue
+                    status_code, statements = endpoint_queries(path, params, users[role])
+                    if status_code != 200:
+                        self.stdout.write(self.style.WARNING(f'SKIPPED   {path} ({role}): HTTP {status_code}'))
+                        continue
+                    for number, sql in enumerate(statements, start=1):
+                        with connection.cursor() as cursor:
+                            cursor.execute(f'EXPLAIN {sql}')
+                            plan = '\n'.join(row[0] for row in cursor.fetchall())
+                        self.check_plan(f'{path} ({role}) query {number}', plan, seq_scans, options)
+
+            # The endpoints are only read, but leave nothing behind
+            transaction.set_rollback(True)
+
+        if seq_scans:
+            for label, plan in seq_scans:
+                self.stdout.write(f'\n{label}:\n{plan}')
+            raise CommandError(f'{len(seq_scans)} queries use a sequential scan')
+
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index'))
+
+    def check_plan(self, label, plan, seq_scans, options):
+        if options['verbose_plans']:
+            self.stdout.write(f'{label}:\n{plan}\n')
+        if 'Seq Scan' in plan:
+            seq_scans.append((label, plan))
+            self.stdout.write(self.style.ERROR(f'SEQ SCAN  {label}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'OK        {label}'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from certificates.integrity import resumable_sweep, run_sweep
+from certificates.models import IntegritySweep
+
+
+class Command(BaseCommand):
+    help = 'Re-hash certificates in parallel and record the ones whose blockchain hash no longer matches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Hashing processes (default: INTEGRITY_SWEEP_WORKERS or all cores)')
+        parser.add_argument('--chunk-size', type=int, help='Rows per hashing task')
+        parser.add_argument('--start', help='First certificate id of the range to check')
+        parser.add_argument('--end', help='Last certificate id of the range to check')
+        parser.add_argument('--resume', nargs='?', const='latest', help='Resume a sweep by id, or the latest unfinished one')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            if options['resume'] == 'latest':
+                sweep = resumable_sweep()
+            else:
+                sweep = IntegritySweep.objects.filter(pk=options['resume']).first()
+            if sweep is None or sweep.status == 'completed':
+                raise CommandError('No unfinished sweep to resume')
+        else:
+            sweep = IntegritySweep.objects.create(range_start=options['start'], range_end=options['end'])
+
+        self.stdout.write(f'Sweep {sweep.pk} started')
+        sweep = run_sweep(sweep, workers=options['workers'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {sweep.checked_count} certificates ({sweep.rows_per_second}/s), '
+            f'{sweep.mismatch_count} mismatches'
+        ))
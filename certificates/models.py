@@ -1,13 +1,16 @@
-from django.db import models
+from django.db import models, transaction
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import uuid
 import qrcode
 from io import BytesIO
 from django.core.files import File
 from PIL import Image
-import hashlib
-import json
+
+from certificates.hashing import certificate_hash, hash_matches, hash_values
 
 User = get_user_model()
 
@@ -18,6 +21,8 @@ class Certificate(models.Model):
         ('verified', _('Tasdiqlangan')),
         ('revoked', _('Bekor qilingan')),
     ]
+    # Statuses whose hash is anchored on the blockchain
+    ANCHORED_STATUSES = ('issued', 'verified')
     
     TYPE_CHOICES = [
         ('diploma', _('Diplom')),
@@ -71,10 +76,33 @@ class Certificate(models.Model):
         verbose_name = _('Sertifikat')
         verbose_name_plural = _('Sertifikatlar')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['issuer', 'status']),
+            models.Index(fields=['holder', 'status']),
+            models.Index(fields=['issuer', 'created_at']),
+            models.Index(fields=['holder', 'created_at']),
+            models.Index(fields=['is_verified', 'status']),
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+        constraints = [
+            # blockchain_hash may be blank, so only non-empty hashes have to be unique
+            models.UniqueConstraint(
+                fields=['blockchain_hash'],
+                condition=~models.Q(blockchain_hash=''),
+                name='unique_certificate_blockchain_hash',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.holder.full_name}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     def save(self, *args, **kwargs):
         # Generate certificate ID if not exists
         if not self.certificate_id:
@@ -84,25 +112,59 @@ class Certificate(models.Model):
         if not self.blockchain_hash:
             self.blockchain_hash = self.generate_blockchain_hash()
         
+        if self._state.adding:
+            self.add_to_lookup_filter()
+        
+        # Anchor the hash once the certificate is issued
+        if self.status in self.ANCHORED_STATUSES and getattr(self, '_loaded_status', None) not in self.ANCHORED_STATUSES:
+            self.queue_anchor()
+        self._loaded_status = self.status
+        
+        # In synchronous mode render the QR code up front so it goes into the same write
+        if not self.qr_code and settings.QR_CODE_SYNC and kwargs.get('update_fields') is None:
+            self.render_qr_code()
+        
         super().save(*args, **kwargs)
+        self.invalidate_verification_cache()
         
-        # Generate QR code after saving
         if not self.qr_code:
-            self.generate_qr_code()
-    
-    def generate_blockchain_hash(self):
-        """Generate a mock blockchain hash"""
-        data = {
-            'certificate_id': self.certificate_id,
-            'holder_email': self.holder.email,
-            'issuer_email': self.issuer.email,
-            'title': self.title,
-            'issue_date': str(self.issue_date),
-        }
-        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+            if settings.QR_CODE_SYNC:
+                self.generate_qr_code()
+            else:
+                self.schedule_qr_code()
     
-    def generate_qr_code(self):
-        """Generate QR code for certificate verification"""
+    def delete(self, *args, **kwargs):
+        self.invalidate_verification_cache()
+        return super().delete(*args, **kwargs)
+    
+    def add_to_lookup_filter(self):
+        """Make the new certificate known to the negative lookup filter once it is committed"""
+        from verification.lookup_filter import add_certificates
+        certificates = [(self.certificate_id, self.blockchain_hash)]
+        transaction.on_commit(lambda: add_certificates(certificates))
+    
+    def queue_anchor(self):
+        """Queue the blockchain anchor of the certificate's hash once it is committed"""
+        from blockchain.anchoring import queue_anchors
+        certificates = [(self.pk, self.certificate_id, self.blockchain_hash)]
+        transaction.on_commit(lambda: queue_anchors(certificates), robust=True)
+    
+    def invalidate_verification_cache(self):
+        """Drop the cached public verification payload of this certificate once the change is committed"""
+        from verification.cache import invalidate_verification_keys
+        certificates = [(self.certificate_id, self.blockchain_hash)]
+        transaction.on_commit(lambda: invalidate_verification_keys(certificates), robust=True)
+    
+    def generate_blockchain_hash(self, version=None):
+        """Hash of the certificate's identifying fields; select_related holder and issuer to avoid queries"""
+        return certificate_hash(hash_values(self), version)
+    
+    def has_valid_blockchain_hash(self):
+        """Whether blockchain_hash still matches, checked with the scheme that produced it"""
+        return hash_matches(self.blockchain_hash, hash_values(self))
+    
+    def render_qr_code(self):
+        """Render the verification QR code into qr_code without saving the row"""
         qr_data = f"https://certifynow.uz/verify?id={self.certificate_id}"
         qr = qrcode.QRCode(version=1, box_size=10, border=5)
         qr.add_data(qr_data)
@@ -114,7 +176,21 @@ class Certificate(models.Model):
         
         filename = f'qr_{self.certificate_id}.png'
         self.qr_code.save(filename, File(buffer), save=False)
-        self.save(update_fields=['qr_code'])
+    
+    def generate_qr_code(self):
+        """Generate QR code for certificate verification and store it with a single-column UPDATE"""
+        self.render_qr_code()
+        Certificate.objects.filter(pk=self.pk).update(qr_code=self.qr_code.name)
+        self.invalidate_verification_cache()
+    
+    def schedule_qr_code(self):
+        """Queue QR code generation once per certificate, after the transaction commits"""
+        from certificates.tasks import generate_certificate_qr
+        
+        pending_key = f'certificates:qr-pending:{self.certificate_id}'
+        if cache.add(pending_key, True, timeout=settings.QR_CODE_PENDING_TIMEOUT):
+            certificate_id = self.certificate_id
+            transaction.on_commit(lambda: generate_certificate_qr.delay(certificate_id), robust=True)
 
 class CertificateTemplate(models.Model):
     name = models.CharField(_('Shablon nomi'), max_length=255)
@@ -141,3 +217,104 @@ class CertificateVerification(models.Model):
         verbose_name = _('Sertifikat tekshiruvi')
         verbose_name_plural = _('Sertifikat tekshiruvlari')
         ordering = ['-verification_date']
+
+
+class CertificateImportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', _('Kutilmoqda')),
+        ('processing', _('Bajarilmoqda')),
+        ('completed', _('Yakunlangan')),
+        ('failed', _('Muvaffaqiyatsiz')),
+    ]
+    
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    issuer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='certificate_imports', verbose_name=_('Chiqaruvchi'))
+    file = models.FileField(_('Import fayli'), upload_to='imports/')
+    file_format = models.CharField(_('Fayl formati'), max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(_('Holat'), max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    # Progress
+    processed_rows = models.IntegerField(_('Qayta ishlangan qatorlar'), default=0)
+    created_count = models.IntegerField(_('Yaratilgan sertifikatlar'), default=0)
+    error_count = models.IntegerField(_('Xatolar soni'), default=0)
+    errors = models.JSONField(_('Xatolar'), default=list, blank=True)
+    error_message = models.TextField(_('Xato xabari'), blank=True)
+    
+    created_at = models.DateTimeField(_('Yaratilgan vaqt'), auto_now_add=True)
+    started_at = models.DateTimeField(_('Boshlangan vaqt'), blank=True, null=True)
+    finished_at = models.DateTimeField(_('Tugagan vaqt'), blank=True, null=True)
+    
+    class Meta:
+        verbose_name = _('Sertifikat importi')
+        verbose_name_plural = _('Sertifikat importlari')
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Import {self.id} ({self.status})"
+    
+    @property
+    def rows_per_second(self):
+        """Import throughput so far"""
+        if not self.started_at:
+            return 0
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return round(self.processed_rows / elapsed, 2) if elapsed > 0 else 0
+
+
+class IntegritySweep(models.Model):
+    """One pass that re-hashes certificates and records the ones that no longer match"""
+    STATUS_CHOICES = [
+        ('running', _('Bajarilmoqda')),
+        ('completed', _('Yakunlangan')),
+        ('failed', _('Muvaffaqiyatsiz')),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(_('Holat'), max_length=20, choices=STATUS_CHOICES, default='running')
+    
+    # Certificate id range covered (open ends when empty) and progress within it
+    range_start = models.UUIDField(_('Boshlang\'ich ID'), blank=True, null=True)
+    range_end = models.UUIDField(_('Oxirgi ID'), blank=True, null=True)
+    last_checked_id = models.UUIDField(_('Oxirgi tekshirilgan ID'), blank=True, null=True)
+    
+    checked_count = models.BigIntegerField(_('Tekshirilgan sertifikatlar'), default=0)
+    mismatch_count = models.IntegerField(_('Mos kelmaganlar'), default=0)
+    error_message = models.TextField(_('Xato xabari'), blank=True)
+    
+    started_at = models.DateTimeField(_('Boshlangan vaqt'), auto_now_add=True)
+    finished_at = models.DateTimeField(_('Tugagan vaqt'), blank=True, null=True)
+    
+    class Meta:
+        verbose_name = _('Yaxlitlik tekshiruvi')
+        verbose_name_plural = _('Yaxlitlik tekshiruvlari')
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"Integrity sweep {self.id} ({self.status})"
+    
+    @property
+    def rows_per_second(self):
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return round(self.checked_count / elapsed, 2) if elapsed > 0 else 0
+
+
+class IntegrityMismatch(models.Model):
+    """A certificate whose stored blockchain_hash did not match during a sweep"""
+    sweep = models.ForeignKey(IntegritySweep, on_delete=models.CASCADE, related_name='mismatches', verbose_name=_('Tekshiruv'))
+    certificate = models.ForeignKey(Certificate, on_delete=models.CASCADE, related_name='integrity_mismatches', verbose_name=_('Sertifikat'))
+    stored_hash = models.CharField(_('Saqlangan hash'), max_length=255, blank=True)
+    expected_hash = models.CharField(_('Kutilgan hash'), max_length=255, blank=True)
+    detected_at = models.DateTimeField(_('Aniqlangan vaqt'), auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Yaxlitlik buzilishi')
+        verbose_name_plural = _('Yaxlitlik buzilishlari')
+        ordering = ['-detected_at']
+        constraints = [
+            models.UniqueConstraint(fields=['sweep', 'certificate'], name='unique_integrity_mismatch'),
+        ]
@@ -1,8 +1,11 @@
+import os
+
 from rest_framework import serializers
-from certificates.models import Certificate, CertificateTemplate, CertificateVerification
-from accounts.serializers import UserSerializer
+from certificates.models import Certificate, CertificateTemplate, CertificateVerification, CertificateImportJob
+from accounts.serializers import UserSerializer, UserSummarySerializer
+from certifynow.serializers import SparseFieldsetMixin
 
-class CertificateSerializer(serializers.ModelSerializer):
+class CertificateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     holder = UserSerializer(read_only=True)
     issuer = UserSerializer(read_only=True)
     holder_id = serializers.UUIDField(write_only=True, required=False)
@@ -26,6 +29,20 @@ class CertificateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class CertificateSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Read-only certificate for high-volume lists; holder and issuer are ids unless expanded"""
+    expandable_fields = {'holder': UserSummarySerializer, 'issuer': UserSummarySerializer}
+
+    class Meta:
+        model = Certificate
+        fields = [
+            'id', 'certificate_id', 'title', 'certificate_type', 'institution_name',
+            'status', 'is_verified', 'issue_date', 'expiry_date', 'blockchain_hash',
+            'holder', 'issuer',
+        ]
+        read_only_fields = fields
+
+
 class CertificateCreateSerializer(serializers.ModelSerializer):
     holder_email = serializers.EmailField(write_only=True)
 
@@ -80,3 +97,32 @@ class CertificateStatsSerializer(serializers.Serializer):
     revoked_certificates = serializers.IntegerField()
     certificates_this_month = serializers.IntegerField()
     verifications_count = serializers.IntegerField()
+
+
+class CertificateImportJobSerializer(serializers.ModelSerializer):
+    rows_per_second = serializers.FloatField(read_only=True)
+    file_format = serializers.ChoiceField(choices=CertificateImportJob.FORMAT_CHOICES, required=False)
+
+    # File extension -> file_format, used when file_format is not given
+    EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+    class Meta:
+        model = CertificateImportJob
+        fields = [
+            'id', 'file', 'file_format', 'status', 'processed_rows', 'created_count',
+            'error_count', 'errors', 'error_message', 'rows_per_second',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'id', 'status', 'processed_rows', 'created_count', 'error_count', 'errors',
+            'error_message', 'created_at', 'started_at', 'finished_at',
+        ]
+        extra_kwargs = {'file': {'write_only': True}}
+
+    def validate(self, attrs):
+        if not attrs.get('file_format'):
+            extension = os.path.splitext(attrs['file'].name)[1].lower()
+            if extension not in self.EXTENSIONS:
+                raise serializers.ValidationError({'file_format': 'Fayl formati aniqlanmadi: csv yoki ndjson ko\'rsating'})
+            attrs['file_format'] = self.EXTENSIONS[extension]
+        return attrs
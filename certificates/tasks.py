@@ -0,0 +1,75 @@
+from celery import group, shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from certificates.imports import run_import
+from certificates.integrity import create_partition_sweeps, run_sweep
+from certificates.models import Certificate, CertificateImportJob, IntegritySweep
+
+INTEGRITY_SWEEP_LOCK = 'certificates:integrity-sweep'
+
+
+@shared_task(ignore_result=True)
+def generate_certificate_qr(certificate_id):
+    """Render and store the QR code of a certificate.
+
+    Idempotent: certificates that already have a QR code are skipped, so a
+    duplicate or retried task does no work.
+    """
+    certificate = Certificate.objects.filter(certificate_id=certificate_id).only(
+        'id', 'certificate_id', 'blockchain_hash', 'qr_code'
+    ).first()
+    if certificate is not None and not certificate.qr_code:
+        certificate.generate_qr_code()
+    cache.delete(f'certificates:qr-pending:{certificate_id}')
+
+
+@shared_task(ignore_result=True)
+def generate_certificate_qrs(certificate_ids):
+    """Render QR codes for a batch of certificates created by bulk_create"""
+    certificates = Certificate.objects.filter(
+        certificate_id__in=certificate_ids, qr_code=''
+    ).only('id', 'certificate_id', 'blockchain_hash', 'qr_code')
+    for certificate in certificates.iterator():
+        certificate.generate_qr_code()
+
+
+@shared_task(ignore_result=True)
+def run_certificate_import(job_id):
+    """Process an uploaded certificate import file"""
+    job = CertificateImportJob.objects.select_related('issuer').filter(pk=job_id).first()
+    if job is None or job.status == 'completed':
+        return
+    try:
+        run_import(job)
+    except Exception as e:
+        CertificateImportJob.objects.filter(pk=job_id).update(
+            status='failed', error_message=str(e), finished_at=timezone.now()
+        )
+        raise
+
+
+@shared_task(ignore_result=True)
+def run_integrity_sweep():
+    """Resume unfinished integrity sweeps, or start a full sweep split into id range partitions"""
+    sweep_ids = list(IntegritySweep.objects.exclude(status='completed').values_list('pk', flat=True))
+    if not sweep_ids:
+        sweep_ids = [sweep.pk for sweep in create_partition_sweeps(settings.INTEGRITY_SWEEP_PARTITIONS)]
+    # Partitions run in parallel on the Celery workers
+    group(run_integrity_sweep_partition.s(str(sweep_id)) for sweep_id in sweep_ids).apply_async()
+
+
+@shared_task(ignore_result=True)
+def run_integrity_sweep_partition(sweep_id):
+    """Check one sweep's id range in this worker process"""
+    lock = f'{INTEGRITY_SWEEP_LOCK}:{sweep_id}'
+    if not cache.add(lock, True, timeout=settings.INTEGRITY_SWEEP_LOCK_TIMEOUT):
+        # Still running from an earlier dispatch
+        return
+    try:
+        sweep = IntegritySweep.objects.filter(pk=sweep_id).exclude(status='completed').first()
+        if sweep is not None:
+            run_sweep(sweep, workers=1)
+    finally:
+        cache.delete(lock)
@@ -0,0 +1,165 @@
+import hashlib
+import json
+from datetime import date
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from certificates.hashing import (
+    certificate_hash, check_rows, expected_hash, hash_matches, hash_rows, hash_version, verify_hashes
+)
+from certificates.models import Certificate, CertificateImportJob
+from certifynow.testing import TEST_CACHES, create_certificate, create_user
+
+
+def legacy_hash(certificate_id, holder_email, issuer_email, title, issue_date):
+    """The hash certificates were issued with before hashing schemes were versioned"""
+    data = {
+        'certificate_id': certificate_id,
+        'holder_email': holder_email,
+        'issuer_email': issuer_email,
+        'title': title,
+        'issue_date': str(issue_date),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+class HashSchemeTests(SimpleTestCase):
+    values = [
+        ('CERT-0A1B2C3D', 'talaba@example.com', 'admin@example.com', 'Python asoslari', date(2024, 6, 1)),
+        ('CERT-FFFFFFFF', 'o.ali@example.uz', 'tatu@example.uz', 'Oʻzbek tili — “B2” darajasi', date(2023, 1, 31)),
+        ('CERT-12345678', 'a"b@example.com', 'c\\d@example.com', 'Tab\there\nnew line', date(2020, 2, 29)),
+        ('CERT-87654321', 'x@example.com', 'y@example.com', '中文证书 😀', '2021-12-01'),
+    ]
+
+    def test_v1_matches_legacy_json_hash(self):
+        for values in self.values:
+            with self.subTest(title=values[3]):
+                self.assertEqual(certificate_hash(values, version=1), legacy_hash(*values))
+
+    def test_v1_hash_is_bare_hex(self):
+        digest = certificate_hash(self.values[0], version=1)
+        self.assertEqual(len(digest), 64)
+        self.assertEqual(hash_version(digest), 1)
+
+    def test_later_versions_are_prefixed(self):
+        digest = certificate_hash(self.values[0], version=2)
+        self.assertTrue(digest.startswith('2:'))
+        self.assertEqual(hash_version(digest), 2)
+        self.assertNotEqual(digest[2:], certificate_hash(self.values[0], version=1))
+
+    def test_stored_hash_is_checked_with_its_own_scheme(self):
+        values = self.values[1]
+        for version in (1, 2):
+            with self.subTest(version=version):
+                stored = certificate_hash(values, version=version)
+                self.assertTrue(hash_matches(stored, values))
+                self.assertFalse(hash_matches(stored, values[:3] + ('Boshqa sarlavha',) + values[4:]))
+
+    def test_unknown_scheme_never_matches(self):
+        self.assertIsNone(expected_hash('9:abc', self.values[0]))
+        self.assertFalse(hash_matches('9:abc', self.values[0]))
+        self.assertFalse(hash_matches('', self.values[0]))
+
+    def test_check_rows_reports_mismatches(self):
+        good = certificate_hash(self.values[0], version=1)
+        rows = [
+            ('pk-1', good, *self.values[0]),
+            ('pk-2', good, *self.values[1]),
+            ('pk-3', '', *self.values[2]),
+        ]
+        self.assertEqual(check_rows(rows), [
+            ('pk-2', good, legacy_hash(*self.values[1])),
+            ('pk-3', '', legacy_hash(*self.values[2])),
+        ])
+
+
+@override_settings(CACHES=TEST_CACHES, QR_CODE_SYNC=False)
+class CertificateHashTests(TestCase):
+    def setUp(self):
+        self.holder = create_user('student')
+        self.issuer = create_user('admin')
+
+    @override_settings(CERTIFICATE_HASH_VERSION=1)
+    def test_new_certificates_keep_the_legacy_hash(self):
+        certificate = create_certificate(self.holder, self.issuer)
+        self.assertEqual(certificate.blockchain_hash, legacy_hash(
+            certificate.certificate_id, self.holder.email, self.issuer.email,
+            certificate.title, certificate.issue_date
+        ))
+
+    def test_old_and_new_hashes_verify_side_by_side(self):
+        with self.settings(CERTIFICATE_HASH_VERSION=1):
+            old = create_certificate(self.holder, self.issuer)
+        with self.settings(CERTIFICATE_HASH_VERSION=2):
+            new = create_certificate(self.holder, self.issuer)
+        tampered = create_certificate(self.holder, self.issuer)
+        Certificate.objects.filter(pk=tampered.pk).update(title='Soxta sarlavha')
+
+        self.assertTrue(new.blockchain_hash.startswith('2:'))
+        self.assertEqual(verify_hashes([old.pk, new.pk, tampered.pk]), [tampered.pk])
+        certificate = Certificate.objects.select_related('holder', 'issuer').get(pk=old.pk)
+        self.assertTrue(certificate.has_valid_blockchain_hash())
+
+    def test_hash_rows_matches_instance_values(self):
+        certificate = create_certificate(self.holder, self.issuer)
+        rows = list(hash_rows(Certificate.objects.filter(pk=certificate.pk)))
+        self.assertEqual(check_rows(rows), [])
+
+
+@override_settings(CACHES=TEST_CACHES, QR_CODE_SYNC=False)
+class CertificateListQueryTests(TestCase):
+    url = '/api/v1/certificates/'
+
+    def setUp(self):
+        self.holder = create_user('student')
+        self.issuer = create_user('admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.holder)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        for _ in range(2):
+            create_certificate(self.holder, self.issuer)
+        self.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.get(self.url).data['results']), 2)
+
+        for _ in range(8):
+            create_certificate(self.holder, self.issuer)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(len(self.get(self.url).data['results']), 10)
+
+    def test_only_the_holders_certificates_are_listed(self):
+        mine = create_certificate(self.holder, self.issuer)
+        create_certificate(create_user('student'), self.issuer)
+        results = self.get(self.url).data['results']
+        self.assertEqual([row['id'] for row in results], [str(mine.pk)])
+
+
+@override_settings(CACHES=TEST_CACHES, QR_CODE_SYNC=False)
+class CertificateImportDetailTests(TestCase):
+    def setUp(self):
+        self.job = CertificateImportJob.objects.create(
+            issuer=create_user('admin'), file='imports/sertifikatlar.csv', file_format='csv'
+        )
+        self.url = f'/api/v1/certificates/imports/{self.job.pk}/'
+
+    def get(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(self.url)
+
+    def test_issuer_and_platform_admin_can_see_the_job(self):
+        for user in (self.job.issuer, create_user('superadmin')):
+            with self.subTest(role=user.role):
+                self.assertEqual(self.get(user).status_code, 200)
+
+    def test_other_issuers_cannot(self):
+        self.assertEqual(self.get(create_user('admin')).status_code, 404)
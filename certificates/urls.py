@@ -1,13 +1,17 @@
 from django.urls import path
 from certificates.views import (
     CertificateListCreateView, CertificateDetailView,
-    certificate_stats, bulk_create_certificates, revoke_certificate
+    certificate_stats, bulk_create_certificates, revoke_certificate,
+    CertificateImportCreateView, CertificateImportDetailView, CertificateExportView
 )
 
 urlpatterns = [
     path('', CertificateListCreateView.as_view(), name='certificate-list-create'),
     path('<uuid:pk>/', CertificateDetailView.as_view(), name='certificate-detail'),
     path('<uuid:pk>/revoke/', revoke_certificate, name='certificate-revoke'),
+    path('export/', CertificateExportView.as_view(), name='certificate-export'),
     path('bulk-create/', bulk_create_certificates, name='certificate-bulk-create'),
+    path('imports/', CertificateImportCreateView.as_view(), name='certificate-import-create'),
+    path('imports/<uuid:pk>/', CertificateImportDetailView.as_view(), name='certificate-import-detail'),
     path('stats/', certificate_stats, name='certificate-stats'),
 ]
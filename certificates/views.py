@@ -1,23 +1,32 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
 from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
-from certificates.models import Certificate, CertificateTemplate, CertificateVerification
+from certificates.models import Certificate, CertificateTemplate, CertificateVerification, CertificateImportJob
 from certificates.serializers import (
     CertificateSerializer, CertificateCreateSerializer,
     CertificateTemplateSerializer, CertificateVerificationSerializer,
-    CertificateStatsSerializer
+    CertificateStatsSerializer, CertificateImportJobSerializer, CertificateSummarySerializer
 )
 from certificates.permissions import (
     CanCreateCertificatePermission, IsOwnerOrIssuerOrCanView,
     IsSuperAdminPermission, IsInstitutionAdminPermission
 )
+from certificates.bulk import create_certificates
+from certificates.tasks import run_certificate_import
 from rest_framework.permissions import IsAuthenticated
+from accounts.access import get_access_scope
+from analytics.services import certificate_counts
+from certifynow.exports import export_response
+from certifynow.serializers import query_param_list
 
 @extend_schema(
     summary="Sertifikat yaratish",
@@ -34,6 +43,10 @@ class CertificateCreateView(generics.CreateAPIView):
     summary="List and Create Certificates",
     description="List all certificates for the current user based on their role or create a new certificate (issuer only).",
     request=CertificateCreateSerializer,
+    parameters=[
+        OpenApiParameter(name="fields", type=str, location=OpenApiParameter.QUERY, required=False,
+                         description="Comma separated fields to return"),
+    ],
     responses={
         200: OpenApiResponse(response=CertificateSerializer, description="List of certificates"),
         201: OpenApiResponse(response=CertificateSerializer, description="Certificate successfully created"),
@@ -52,17 +65,9 @@ class CertificateListCreateView(generics.ListCreateAPIView):
     ordering = ['-created_at']
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'superadmin':
-            return Certificate.objects.all()
-        elif user.role == 'admin':
-            return Certificate.objects.filter(issuer=user)
-        elif user.role == 'student':
-            return Certificate.objects.filter(holder=user)
-        elif user.role == 'checker':
-            # Checker can view all certificates for verification purposes
-            return Certificate.objects.all()
-        return Certificate.objects.none()
+        scope = get_access_scope(self.request.user)
+        # holder and issuer are nested with their profiles in CertificateSerializer
+        return Certificate.objects.select_related('holder__profile', 'issuer__profile').filter(scope.certificates())
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -75,6 +80,39 @@ class CertificateListCreateView(generics.ListCreateAPIView):
         return [permissions.IsAuthenticated()]
 
 
+@extend_schema(
+    summary="Export Certificates",
+    description="Stream every certificate visible to the user as CSV or NDJSON. "
+                "Takes the same filters as the certificate list; gzip is applied when the client accepts it.",
+    parameters=[
+        OpenApiParameter(name="file_format", type=str, location=OpenApiParameter.QUERY, required=False,
+                         enum=['csv', 'ndjson'], description="Default csv"),
+        OpenApiParameter(name="fields", type=str, location=OpenApiParameter.QUERY, required=False,
+                         description="Comma separated fields to return"),
+        OpenApiParameter(name="expand", type=str, location=OpenApiParameter.QUERY, required=False,
+                         description="holder,issuer to include the users"),
+    ],
+    responses={200: OpenApiResponse(description="CSV or NDJSON file")},
+    tags=["Certificates"]
+)
+class CertificateExportView(CertificateListCreateView):
+    http_method_names = ['get', 'head', 'options']
+    serializer_class = CertificateSummarySerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        # The summary has holder/issuer ids; only join the users that are expanded
+        expanded = sorted(query_param_list(self.request, 'expand') & {'holder', 'issuer'})
+        return super().get_queryset().select_related(None).select_related(*expanded)
+
+    def get_serializer_class(self):
+        return CertificateSummarySerializer
+
+    def get(self, request, *args, **kwargs):
+        certificates = self.filter_queryset(self.get_queryset())
+        return export_response(request, certificates, self.get_serializer(), 'certificates')
+
+
 @extend_schema(
         summary="Retrieve, Update or Delete a Certificate",
         description="Retrieve certificate details, or update/delete them if you have the proper permissions.",
@@ -91,7 +129,7 @@ class CertificateListCreateView(generics.ListCreateAPIView):
 
 class CertificateDetailView(generics.RetrieveUpdateDestroyAPIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
-    queryset = Certificate.objects.all()
+    queryset = Certificate.objects.select_related('holder__profile', 'issuer__profile')
     serializer_class = CertificateSerializer
     permission_classes = [IsOwnerOrIssuerOrCanView]
 
@@ -128,53 +166,13 @@ class CertificateDetailView(generics.RetrieveUpdateDestroyAPIView):
 @permission_classes([permissions.IsAuthenticated])
 def certificate_stats(request):
     """Get certificate statistics for dashboard"""
-    user = request.user
-
-    if user.role == 'superadmin':
-        queryset = Certificate.objects.all()
-    elif user.role == 'admin':
-        queryset = Certificate.objects.filter(issuer=user)
-    elif user.role == 'student':
-        queryset = Certificate.objects.filter(holder=user)
-    elif user.role == 'checker':
-        queryset = Certificate.objects.all()
-    else:
-        queryset = Certificate.objects.none()
-
-    # Calculate stats
-    total_certificates = queryset.count()
-    verified_certificates = queryset.filter(is_verified=True).count()
-    pending_certificates = queryset.filter(status='draft').count()
-    revoked_certificates = queryset.filter(status='revoked').count()
-
-    # This month certificates
-    this_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    certificates_this_month = queryset.filter(created_at__gte=this_month).count()
-
-    # Verification count based on role
-    if user.role == 'superadmin':
-        verifications_count = CertificateVerification.objects.count()
-    elif user.role == 'admin':
-        verifications_count = CertificateVerification.objects.filter(
-            certificate__issuer=user
-        ).count()
-    elif user.role == 'student':
-        verifications_count = CertificateVerification.objects.filter(
-            certificate__holder=user
-        ).count()
-    elif user.role == 'checker':
-        verifications_count = CertificateVerification.objects.count()
-    else:
-        verifications_count = 0
-
-    stats = {
-        'total_certificates': total_certificates,
-        'verified_certificates': verified_certificates,
-        'pending_certificates': pending_certificates,
-        'revoked_certificates': revoked_certificates,
-        'certificates_this_month': certificates_this_month,
-        'verifications_count': verifications_count,
-    }
+    scope = get_access_scope(request.user)
+    queryset = Certificate.objects.filter(scope.certificates())
+    verifications = CertificateVerification.objects.filter(scope.certificates('certificate__'))
+
+    # Calculate stats: one aggregate for certificates, one count for verifications
+    stats = certificate_counts(queryset)
+    stats['verifications_count'] = verifications.count()
 
     serializer = CertificateStatsSerializer(stats)
     return Response(serializer.data)
@@ -182,10 +180,11 @@ def certificate_stats(request):
 
 @extend_schema(
     summary="Bulk Create Certificates",
-    description="Create multiple certificates in one request. Only institution admins can perform this.",
+    description="Create multiple certificates in one request (at most MAX_CERTIFICATES_PER_BULK). Only institution admins can perform this.",
     request=CertificateCreateSerializer(many=True),
     responses={
-        200: OpenApiResponse(description="Certificates created with details and errors if any"),
+        200: OpenApiResponse(description="Created certificate ids and per-row errors"),
+        400: OpenApiResponse(description="Too many certificates in one request"),
         403: OpenApiResponse(description="Permission denied")
     },
     tags=["Certificates"]
@@ -196,23 +195,19 @@ def certificate_stats(request):
 def bulk_create_certificates(request):
     """Bulk create certificates - only for institution admins"""
     certificates_data = request.data.get('certificates', [])
-    created_certificates = []
-    errors = []
 
-    for i, cert_data in enumerate(certificates_data):
-        serializer = CertificateCreateSerializer(
-            data=cert_data,
-            context={'request': request}
+    if not isinstance(certificates_data, list):
+        return Response(
+            {'error': 'certificates ro\'yxat bo\'lishi kerak'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(certificates_data) > settings.MAX_CERTIFICATES_PER_BULK:
+        return Response(
+            {'error': f'Bir so\'rovda ko\'pi bilan {settings.MAX_CERTIFICATES_PER_BULK} ta sertifikat yaratish mumkin'},
+            status=status.HTTP_400_BAD_REQUEST
         )
 
-        if serializer.is_valid():
-            certificate = serializer.save()
-            created_certificates.append(CertificateSerializer(certificate).data)
-        else:
-            errors.append({
-                'row': i + 1,
-                'errors': serializer.errors
-            })
+    created_certificates, errors = create_certificates(certificates_data, issuer=request.user)
 
     return Response({
         'created_count': len(created_certificates),
@@ -222,6 +217,58 @@ def bulk_create_certificates(request):
     })
 
 
+@extend_schema(
+    summary="Import Certificates",
+    description="Upload a CSV or NDJSON file with certificate rows (same fields as bulk create). "
+                "The file is processed in the background; poll the returned job for progress. "
+                "Only institution admins can perform this.",
+    request={'multipart/form-data': CertificateImportJobSerializer},
+    responses={
+        202: OpenApiResponse(response=CertificateImportJobSerializer, description="Import job queued"),
+        400: OpenApiResponse(description="Invalid file"),
+        403: OpenApiResponse(description="Permission denied")
+    },
+    tags=["Certificates"]
+)
+class CertificateImportCreateView(generics.CreateAPIView):
+    parser_classes = (MultiPartParser,)
+    serializer_class = CertificateImportJobSerializer
+    permission_classes = [IsInstitutionAdminPermission]
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Stream the upload to a temporary file instead of holding it in memory
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        job = serializer.save(issuer=self.request.user)
+        transaction.on_commit(lambda: run_certificate_import.delay(str(job.id)), robust=True)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+
+@extend_schema(
+    summary="Get Certificate Import",
+    description="Progress, counters and per-row errors of a certificate import job.",
+    responses={
+        200: OpenApiResponse(response=CertificateImportJobSerializer, description="Import job"),
+        404: OpenApiResponse(description="Import job not found")
+    },
+    tags=["Certificates"]
+)
+class CertificateImportDetailView(generics.RetrieveAPIView):
+    serializer_class = CertificateImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if get_access_scope(self.request.user).is_platform_admin:
+            return CertificateImportJob.objects.all()
+        return CertificateImportJob.objects.filter(issuer=self.request.user)
+
+
 @extend_schema(
     summary="Revoke a Certificate",
     description="Revoke a certificate (set as 'revoked' and not verified). Only superadmin can revoke.",
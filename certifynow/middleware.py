@@ -0,0 +1,39 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('certifynow')
+
+
+class QueryCountMiddleware:
+    """Count the SQL queries of every request.
+
+    The count is sent in the ``X-Query-Count`` header when QUERY_COUNT_HEADER
+    is on, and requests running more than QUERY_COUNT_WARNING_THRESHOLD
+    queries are logged as likely N+1 regressions. It uses a database execute
+    wrapper, so it also works with DEBUG off.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        if settings.QUERY_COUNT_HEADER:
+            response['X-Query-Count'] = str(count)
+        if count > settings.QUERY_COUNT_WARNING_THRESHOLD:
+            logger.warning('%s %s ran %d SQL queries', request.method, request.path, count)
+        return response
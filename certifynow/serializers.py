@@ -0,0 +1,36 @@
+def query_param_list(request, name):
+    """Comma separated query parameter as a set of names."""
+    value = request.query_params.get(name, '') if request is not None else ''
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+class SparseFieldsetMixin:
+    """Trim and expand serializer fields from the request query string.
+
+    ``?fields=a,b`` keeps only the listed fields of the top-level serializer.
+    ``?expand=holder,issuer`` replaces the fields named in ``expandable_fields``
+    with their nested serializers, at any nesting level. Without it they stay
+    primary keys, which need no extra query.
+    """
+
+    expandable_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+
+        for name in query_param_list(request, 'expand') & set(self.expandable_fields):
+            if name in fields:
+                fields[name] = self.expandable_fields[name](read_only=True)
+
+        requested = query_param_list(request, 'fields')
+        if requested and self.is_root:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        return fields
+
+    @property
+    def is_root(self):
+        parent = self.parent
+        if parent is not None and getattr(parent, 'child', None) is self:
+            parent = parent.parent
+        return parent is None
@@ -1,7 +1,9 @@
 import os
+import sys
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -11,6 +13,7 @@ SECRET_KEY = config('SECRET_KEY', default='django-insecure-change-me-in-producti
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=True, cast=bool)
+TESTING = sys.argv[1:2] == ['test']
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1', cast=lambda v: [s.strip() for s in v.split(',')])
 
 
@@ -33,8 +36,8 @@ THIRD_PARTY_APPS = [
     'django_extensions',
 ]
 
-# Add debug toolbar only in development
-if DEBUG:
+# Add debug toolbar only in development (not under the test runner)
+if DEBUG and not TESTING:
     THIRD_PARTY_APPS.append('debug_toolbar')
 
 LOCAL_APPS = [
@@ -59,10 +62,11 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'certifynow.middleware.QueryCountMiddleware',
 ]
 
 # Add debug toolbar middleware only in development
-if DEBUG:
+if DEBUG and not TESTING:
     MIDDLEWARE.insert(1, 'debug_toolbar.middleware.DebugToolbarMiddleware')
 
 ROOT_URLCONF = 'certifynow.urls'
@@ -149,7 +153,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # REST Framework Configuration - Updated for latest version
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     # 'DEFAULT_PERMISSION_CLASSES': [
@@ -201,7 +205,7 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
     'TOKEN_OBTAIN_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenObtainPairSerializer',
-    'TOKEN_REFRESH_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenRefreshSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.CertifyNowTokenRefreshSerializer',
 }
 
 # CORS Configuration - Updated
@@ -241,10 +245,40 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
-CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULER = 'celery.beat:PersistentScheduler'  # runs CELERY_BEAT_SCHEDULE below
 CELERY_WORKER_HIJACK_ROOT_LOGGER = False
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_TASK_ACKS_LATE = True
+CELERY_BEAT_SCHEDULE = {
+    'drain-verification-audit-stream': {
+        'task': 'verification.tasks.drain_audit_stream',
+        'schedule': 5.0,
+    },
+    'refresh-dashboard-stats': {
+        'task': 'analytics.tasks.refresh_dashboard_stats',
+        'schedule': 300.0,
+    },
+    'rollup-system-stats': {
+        'task': 'analytics.tasks.rollup_system_stats',
+        'schedule': crontab(hour=0, minute=30),
+    },
+    'build-blockchain-blocks': {
+        'task': 'blockchain.tasks.build_blocks',
+        'schedule': float(config('BLOCKCHAIN_BLOCK_INTERVAL', default=60, cast=int)),
+    },
+    'certificate-integrity-sweep': {
+        'task': 'certificates.tasks.run_integrity_sweep',
+        'schedule': crontab(hour=1, minute=0),
+    },
+    'rebuild-certificate-filter': {
+        'task': 'verification.tasks.rebuild_certificate_filter',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'advance-blockchain-confirmations': {
+        'task': 'blockchain.tasks.advance_confirmations',
+        'schedule': float(config('BLOCKCHAIN_CONFIRMATION_INTERVAL', default=15, cast=int)),
+    },
+}
 
 # Cache Configuration - Updated to fix CLIENT_CLASS error
 CACHES = {
@@ -275,6 +309,10 @@ SERVER_EMAIL = DEFAULT_FROM_EMAIL
 BLOCKCHAIN_NETWORK = config('BLOCKCHAIN_NETWORK', default='ethereum_testnet')
 BLOCKCHAIN_CONTRACT_ADDRESS = config('BLOCKCHAIN_CONTRACT_ADDRESS', default='0x1234567890abcdef')
 BLOCKCHAIN_PRIVATE_KEY = config('BLOCKCHAIN_PRIVATE_KEY', default='')
+BLOCKCHAIN_BLOCK_INTERVAL = config('BLOCKCHAIN_BLOCK_INTERVAL', default=60, cast=int)  # seconds between block builds
+BLOCKCHAIN_BLOCK_MAX_TRANSACTIONS = config('BLOCKCHAIN_BLOCK_MAX_TRANSACTIONS', default=1000, cast=int)
+BLOCKCHAIN_ANCHOR_BACKFILL_BATCH = config('BLOCKCHAIN_ANCHOR_BACKFILL_BATCH', default=5000, cast=int)  # certificates checked per block build
+BLOCKCHAIN_CONFIRMATION_INTERVAL = config('BLOCKCHAIN_CONFIRMATION_INTERVAL', default=15, cast=int)  # seconds between confirmation ticks
 
 # File Upload Configuration - Updated
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
@@ -402,7 +440,49 @@ if not DEBUG:
 # Custom Settings
 CERTIFICATE_EXPIRY_DAYS = config('CERTIFICATE_EXPIRY_DAYS', default=365 * 5, cast=int)  # 5 years
 QR_CODE_SIZE = config('QR_CODE_SIZE', default=200, cast=int)
+QR_CODE_SYNC = config('QR_CODE_SYNC', default=False, cast=bool)  # Render QR codes inside the request (tests)
+QR_CODE_PENDING_TIMEOUT = config('QR_CODE_PENDING_TIMEOUT', default=600, cast=int)  # seconds
+CERTIFICATE_HASH_VERSION = config('CERTIFICATE_HASH_VERSION', default=1, cast=int)  # see certificates.hashing
+INTEGRITY_SWEEP_WORKERS = config('INTEGRITY_SWEEP_WORKERS', default=0, cast=int)  # 0 = all cores
+INTEGRITY_SWEEP_CHUNK_SIZE = config('INTEGRITY_SWEEP_CHUNK_SIZE', default=5000, cast=int)
+INTEGRITY_SWEEP_PARTITIONS = config('INTEGRITY_SWEEP_PARTITIONS', default=16, cast=int)  # parallel subtasks of the beat sweep
+INTEGRITY_SWEEP_LOCK_TIMEOUT = config('INTEGRITY_SWEEP_LOCK_TIMEOUT', default=12 * 3600, cast=int)  # seconds
 MAX_CERTIFICATES_PER_BULK = config('MAX_CERTIFICATES_PER_BULK', default=100, cast=int)
+CERTIFICATE_IMPORT_CHUNK_SIZE = config('CERTIFICATE_IMPORT_CHUNK_SIZE', default=1000, cast=int)
+CERTIFICATE_IMPORT_MAX_ERRORS = config('CERTIFICATE_IMPORT_MAX_ERRORS', default=1000, cast=int)  # stored per job
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)  # rows fetched per round trip by streaming exports
+
+# Access Scope Settings (see accounts.access)
+ACCESS_SCOPE_CACHE_TIMEOUT = config('ACCESS_SCOPE_CACHE_TIMEOUT', default=900, cast=int)  # seconds
+
+# Query Count Settings (see certifynow.middleware.QueryCountMiddleware)
+QUERY_COUNT_HEADER = config('QUERY_COUNT_HEADER', default=DEBUG, cast=bool)  # X-Query-Count response header
+QUERY_COUNT_WARNING_THRESHOLD = config('QUERY_COUNT_WARNING_THRESHOLD', default=20, cast=int)
+
+# Verification Cache Settings
+VERIFICATION_CACHE_TIMEOUT = config('VERIFICATION_CACHE_TIMEOUT', default=3600, cast=int)  # 1 hour
+VERIFICATION_CACHE_VERSION = 3  # Bump when the cached payload format changes
+VERIFICATION_BATCH_MAX_ITEMS = config('VERIFICATION_BATCH_MAX_ITEMS', default=500, cast=int)  # per verify/batch/ request
+VERIFICATION_QR_MAX_AGE = config('VERIFICATION_QR_MAX_AGE', default=60, cast=int)  # seconds verify-qr responses may be cached
+VERIFICATION_QR_BEACON = config('VERIFICATION_QR_BEACON', default=False, cast=bool)  # scans audited via the nginx mirror beacon
+
+# Analytics Settings
+DASHBOARD_STATS_DELTA_OVERLAP = config('DASHBOARD_STATS_DELTA_OVERLAP', default=300, cast=int)  # seconds
+
+# Verification Audit Log Settings
+VERIFICATION_AUDIT_MODE = config('VERIFICATION_AUDIT_MODE', default='stream')  # sync, buffer, stream
+VERIFICATION_AUDIT_REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+VERIFICATION_AUDIT_STREAM = 'certifynow:verification-audit'
+VERIFICATION_AUDIT_DEAD_LETTER_STREAM = 'certifynow:verification-audit:dead'
+VERIFICATION_AUDIT_BATCH_SIZE = config('VERIFICATION_AUDIT_BATCH_SIZE', default=500, cast=int)
+VERIFICATION_AUDIT_BUFFER_SIZE = config('VERIFICATION_AUDIT_BUFFER_SIZE', default=10000, cast=int)
+VERIFICATION_AUDIT_FLUSH_INTERVAL = config('VERIFICATION_AUDIT_FLUSH_INTERVAL', default=5, cast=int)  # seconds
+VERIFICATION_AUDIT_CLAIM_IDLE = config('VERIFICATION_AUDIT_CLAIM_IDLE', default=60, cast=int)  # seconds
+
+# Negative lookup filter (see verification.lookup_filter)
+CERTIFICATE_FILTER_REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+CERTIFICATE_FILTER_CAPACITY = config('CERTIFICATE_FILTER_CAPACITY', default=10_000_000, cast=int)  # certificates
+CERTIFICATE_FILTER_ERROR_RATE = config('CERTIFICATE_FILTER_ERROR_RATE', default=0.001, cast=float)
 
 # Notification Settings
 NOTIFICATION_CHANNELS = config(
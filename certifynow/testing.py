@@ -0,0 +1,42 @@
+"""
+Shared fixtures for the app test suites.
+
+Tests run against a local-memory cache so they need nothing but the test
+database; tests that talk to Redis directly skip themselves when it is not
+reachable.
+"""
+import uuid
+from datetime import date
+
+from django.contrib.auth import get_user_model
+
+from accounts.models import UserProfile
+from certificates.models import Certificate
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+def create_user(role='student', **fields):
+    User = get_user_model()
+    name = uuid.uuid4().hex[:12]
+    user = User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='test-password',
+        first_name='Test', last_name=role.title(), role=role, **fields
+    )
+    UserProfile.objects.create(user=user)
+    return user
+
+
+def create_certificate(holder, issuer, **fields):
+    fields = {
+        'title': 'Python dasturlash asoslari',
+        'institution_name': 'Toshkent axborot texnologiyalari universiteti',
+        'issue_date': date(2024, 6, 1),
+        'status': 'issued',
+        **fields,
+    }
+    return Certificate.objects.create(holder=holder, issuer=issuer, **fields)
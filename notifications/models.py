@@ -60,6 +60,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['recipient', 'status']),
             models.Index(fields=['notification_type', 'created_at']),
+            models.Index(fields=['recipient', 'created_at', 'id']),
         ]
     
     def __str__(self):
@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from django.utils import timezone
 from .models import Notification, NotificationPreference
 from .serializers import NotificationSerializer, NotificationPreferenceSerializer
+from certifynow.pagination import KeysetPagination
 
 @extend_schema(
     summary="Foydalanuvchining bildirishnomalar ro'yxati",
@@ -22,7 +23,8 @@ class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['notification_type', 'channel', 'status']
-    ordering = ['-created_at']
+    # Newest first by (created_at, id) keyset
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         return Notification.objects.filter(recipient=self.request.user)
@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from accounts.access import invalidate_access_scope
 from django.utils.translation import gettext_lazy as _
 import uuid
 
@@ -81,3 +84,28 @@ class OrganizationMembership(models.Model):
         verbose_name = _('Tashkilot a\'zoligi')
         verbose_name_plural = _('Tashkilot a\'zoliklari')
         unique_together = ['organization', 'user']
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_access_scope(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_access_scope(self.user_id)
+        return result
+
+
+@receiver(m2m_changed, sender=Organization.admin_users.through)
+def invalidate_admin_access_scopes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Administered organizations are part of the cached access scope"""
+    if reverse:
+        # instance is the user
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_access_scope(instance.pk)
+    elif action == 'pre_clear':
+        # Remember who loses access; the rows are gone by post_clear
+        instance._cleared_admin_ids = list(instance.admin_users.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        user_ids = pk_set if action != 'post_clear' else instance.__dict__.pop('_cleared_admin_ids', [])
+        for user_id in user_ids or []:
+            invalidate_access_scope(user_id)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Organization, OrganizationMembership
 from accounts.serializers import UserSerializer
+from certificates.models import Certificate
 
 class OrganizationSerializer(serializers.ModelSerializer):
     admin_users = UserSerializer(many=True, read_only=True)
@@ -13,9 +14,14 @@ class OrganizationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_certificates_count(self, obj):
-        return obj.issued_certificates.count() if hasattr(obj, 'issued_certificates') else 0
+        # Certificates issued by the organization's admins; annotated by the list views
+        if hasattr(obj, 'issued_certificates_count'):
+            return obj.issued_certificates_count
+        return Certificate.objects.filter(issuer__administered_organizations=obj).count()
     
     def get_members_count(self, obj):
+        if hasattr(obj, 'active_members_count'):
+            return obj.active_members_count
         return obj.memberships.filter(is_active=True).count()
 
 class OrganizationMembershipSerializer(serializers.ModelSerializer):
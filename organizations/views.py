@@ -1,6 +1,7 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from accounts.access import get_access_scope
 from organizations.models import Organization, OrganizationMembership
 from organizations.permissions import InstitutionPermissions
 from organizations.serializers import (
@@ -9,6 +10,30 @@ from organizations.serializers import (
 )
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.contrib.auth import get_user_model
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from certificates.models import Certificate
+
+User = get_user_model()
+
+
+def _count_subquery(queryset, group_field):
+    """Correlated COUNT(*) of ``queryset`` rows grouped by ``group_field``"""
+    counts = queryset.order_by().values(group_field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def with_organization_details(organizations):
+    """Annotate the counters and prefetch the admins OrganizationSerializer renders"""
+    members = OrganizationMembership.objects.filter(organization=OuterRef('pk'), is_active=True)
+    certificates = Certificate.objects.filter(issuer__administered_organizations=OuterRef('pk'))
+    return organizations.annotate(
+        active_members_count=_count_subquery(members, 'organization'),
+        issued_certificates_count=_count_subquery(certificates, 'issuer__administered_organizations'),
+    ).prefetch_related(
+        Prefetch('admin_users', queryset=User.objects.select_related('profile'))
+    )
 
 
 @extend_schema(
@@ -38,13 +63,8 @@ class OrganizationListCreateView(generics.ListCreateAPIView):
         return OrganizationSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'admin':
-            return Organization.objects.all()
-        elif user.role == 'organization':
-            return Organization.objects.filter(admin_users=user)
-        else:
-            return Organization.objects.filter(is_verified=True, is_active=True)
+        scope = get_access_scope(self.request.user)
+        return with_organization_details(Organization.objects.filter(scope.organizations()))
 
 @extend_schema(
         summary="Retrieve, Update, or Delete Organization",
@@ -60,7 +80,7 @@ class OrganizationListCreateView(generics.ListCreateAPIView):
 class OrganizationDetailView(generics.RetrieveUpdateDestroyAPIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
     permission_classes = [permissions.IsAuthenticated, InstitutionPermissions]
-    queryset = Organization.objects.all()
+    queryset = with_organization_details(Organization.objects.all())
     serializer_class = OrganizationSerializer
 
 
@@ -90,9 +110,12 @@ class OrganizationMembershipListView(generics.ListAPIView):
 
     def get_queryset(self):
         organization_id = self.kwargs.get('organization_id')
+        # Every row nests the same organization; load it (with its counters) once
         return OrganizationMembership.objects.filter(
             organization_id=organization_id,
             is_active=True
+        ).select_related('user__profile').prefetch_related(
+            Prefetch('organization', queryset=with_organization_details(Organization.objects.all()))
         )
 
 
@@ -0,0 +1,245 @@
+"""
+Buffered audit logging for the public verification endpoints.
+
+Request handlers only enqueue plain-dict records; the rows are written in
+batches with ``bulk_create``. The behaviour is selected by
+``VERIFICATION_AUDIT_MODE``:
+
+- ``sync``:   write every record immediately (old behaviour, used in tests)
+- ``buffer``: bounded-loss mode. Records go to an in-process ring buffer that
+              is handed to a Celery task when full or stale. If the buffer
+              overflows the oldest records are dropped, and whatever is still
+              buffered when a process is killed is lost.
+- ``stream``: at-least-once mode. Records are appended to a Redis stream and
+              drained by a Celery beat task through a consumer group; entries
+              are only acknowledged after the batch has been committed.
+              Records that cannot be written at all are moved to a dead
+              letter stream.
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+STREAM_GROUP = 'audit-writers'
+
+_buffer = deque(maxlen=settings.VERIFICATION_AUDIT_BUFFER_SIZE)
+_buffer_lock = threading.Lock()
+_last_flush = time.monotonic()
+_redis_client = None
+
+
+def verification_request_record(certificate_id, issuer_id=None, **fields):
+    """A VerificationRequest record, with its public reference and date"""
+    reference = str(uuid.uuid4())
+    verification_date = timezone.now()
+    record = {
+        'model': 'request',
+        'reference': reference,
+        'certificate_id': str(certificate_id),
+        'issuer_id': str(issuer_id) if issuer_id is not None else None,
+        'verification_date': verification_date.isoformat(),
+        **fields
+    }
+    return record, reference, verification_date
+
+
+def verification_log_record(certificate_id, user=None, **fields):
+    fields.setdefault('timestamp', timezone.now().isoformat())
+    return {
+        'model': 'log',
+        'certificate_id': str(certificate_id),
+        'user_id': str(user.pk) if user is not None else None,
+        **fields
+    }
+
+
+def log_verification_request(certificate_id, issuer_id=None, **fields):
+    """Enqueue a VerificationRequest row and return its public reference and date"""
+    record, reference, verification_date = verification_request_record(certificate_id, issuer_id, **fields)
+    enqueue(record)
+    return reference, verification_date
+
+
+def log_verification(certificate_id, user=None, **fields):
+    """Enqueue a VerificationLog row"""
+    enqueue(verification_log_record(certificate_id, user, **fields))
+
+
+def enqueue(record):
+    enqueue_many([record])
+
+
+def enqueue_many(records):
+    """Enqueue records together: one pipelined XADD, or one bulk write in sync mode"""
+    if not records:
+        return
+    mode = settings.VERIFICATION_AUDIT_MODE
+    if mode == 'stream':
+        try:
+            pipeline = get_redis().pipeline(transaction=False)
+            for record in records:
+                pipeline.xadd(settings.VERIFICATION_AUDIT_STREAM, {'record': json.dumps(record)})
+            pipeline.execute()
+            return
+        except redis.RedisError:
+            # Never fail a verification because the audit stream is down
+            logger.exception('Audit stream unavailable, writing %d records synchronously', len(records))
+        write_records(records)
+    elif mode == 'buffer':
+        for record in records:
+            _buffer_record(record)
+    else:
+        write_records(records)
+
+
+def write_records(records):
+    """Bulk insert a batch of audit records, one INSERT per model"""
+    from verification.models import VerificationRequest, VerificationLog
+
+    verification_requests = []
+    verification_logs = []
+    for record in records:
+        record = dict(record)
+        model = record.pop('model')
+        if model == 'request':
+            record['verification_date'] = parse_datetime(record['verification_date'])
+            verification_requests.append(VerificationRequest(**record))
+        else:
+            record['timestamp'] = parse_datetime(record['timestamp'])
+            verification_logs.append(VerificationLog(**record))
+
+    batch_size = settings.VERIFICATION_AUDIT_BATCH_SIZE
+    if verification_requests:
+        VerificationRequest.objects.bulk_create(verification_requests, batch_size=batch_size)
+    if verification_logs:
+        VerificationLog.objects.bulk_create(verification_logs, batch_size=batch_size)
+    return len(records)
+
+
+def _buffer_record(record):
+    global _last_flush
+
+    with _buffer_lock:
+        if len(_buffer) == _buffer.maxlen:
+            logger.warning('Audit buffer full, dropping oldest record')
+        _buffer.append(record)
+        due = (
+            len(_buffer) >= settings.VERIFICATION_AUDIT_BATCH_SIZE
+            or time.monotonic() - _last_flush >= settings.VERIFICATION_AUDIT_FLUSH_INTERVAL
+        )
+        if not due:
+            return
+        records = list(_buffer)
+        _buffer.clear()
+        _last_flush = time.monotonic()
+
+    from verification.tasks import write_audit_batch
+    try:
+        write_audit_batch.delay(records)
+    except Exception:
+        logger.exception('Could not dispatch audit batch, writing %d records inline', len(records))
+        write_records(records)
+
+
+def flush_buffer():
+    """Write out whatever is left in the in-process buffer (used on shutdown)"""
+    with _buffer_lock:
+        records = list(_buffer)
+        _buffer.clear()
+    if records:
+        write_records(records)
+    return len(records)
+
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.VERIFICATION_AUDIT_REDIS_URL)
+    return _redis_client
+
+
+def _ensure_group(client):
+    try:
+        client.xgroup_create(settings.VERIFICATION_AUDIT_STREAM, STREAM_GROUP, id='0', mkstream=True)
+    except redis.ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def _dead_letter(client, entry_id, data, error):
+    logger.error('Audit record %s could not be written, moved to the dead letter stream: %s', entry_id, error)
+    client.xadd(settings.VERIFICATION_AUDIT_DEAD_LETTER_STREAM, {
+        'entry_id': entry_id,
+        'record': data.get(b'record', b''),
+        'error': str(error),
+    })
+
+
+def _write_stream_entries(client, entries):
+    """Write and acknowledge stream entries.
+
+    When the batch fails (e.g. a certificate was deleted in the meantime) the
+    entries are retried one at a time and the ones that still fail go to the
+    dead letter stream, so a single bad record cannot block the group.
+    """
+    if not entries:
+        return 0
+    ids = [entry_id for entry_id, _ in entries]
+    written = 0
+    try:
+        with transaction.atomic():
+            written = write_records([json.loads(data[b'record']) for _, data in entries])
+    except Exception:
+        logger.exception('Audit batch of %d records failed, retrying one by one', len(entries))
+        for entry_id, data in entries:
+            try:
+                with transaction.atomic():
+                    written += write_records([json.loads(data[b'record'])])
+            except Exception as e:
+                _dead_letter(client, entry_id, data, e)
+    client.xack(settings.VERIFICATION_AUDIT_STREAM, STREAM_GROUP, *ids)
+    client.xdel(settings.VERIFICATION_AUDIT_STREAM, *ids)
+    return written
+
+
+def drain_stream(consumer, max_batches=None):
+    """Write pending stream entries in batches; returns the number of records written.
+
+    Entries delivered to a consumer that died before acknowledging them are
+    reclaimed first, so a crash only causes duplicates, never loss.
+    """
+    client = get_redis()
+    stream = settings.VERIFICATION_AUDIT_STREAM
+    batch_size = settings.VERIFICATION_AUDIT_BATCH_SIZE
+    _ensure_group(client)
+
+    _, claimed, *_ = client.xautoclaim(
+        stream, STREAM_GROUP, consumer,
+        min_idle_time=settings.VERIFICATION_AUDIT_CLAIM_IDLE * 1000,
+        start_id='0-0', count=batch_size
+    )
+    written = _write_stream_entries(client, claimed)
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        response = client.xreadgroup(STREAM_GROUP, consumer, {stream: '>'}, count=batch_size)
+        if not response:
+            break
+        written += _write_stream_entries(client, response[0][1])
+        batches += 1
+    return written
+
+
+atexit.register(flush_buffer)
@@ -0,0 +1,129 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from blockchain.anchoring import certificate_anchor, certificate_anchors
+from certificates.models import Certificate
+
+INVALIDATE_BATCH_SIZE = 1000
+
+
+def _id_key(certificate_id):
+    return f'verification:id:{certificate_id}'
+
+
+def _hash_key(blockchain_hash):
+    return f'verification:hash:{blockchain_hash}'
+
+
+def build_verification_entry(certificate, anchors=None):
+    """Build the public verification payload for a certificate.
+
+    Only request-independent data is stored; absolute URLs and the
+    verification section are added by the views on every request.
+    ``anchors`` is a preloaded certificate_anchors() result.
+    """
+    holder = certificate.holder
+    anchor = anchors.get(certificate.pk) if anchors is not None else certificate_anchor(certificate)
+    return {
+        'pk': certificate.pk,
+        'issuer_pk': certificate.issuer_id,
+        'certificate_id': certificate.certificate_id,
+        'blockchain_hash': certificate.blockchain_hash,
+        'hash_verified': certificate.has_valid_blockchain_hash(),
+        'is_valid': certificate.status == 'issued' and certificate.is_verified,
+        'updated_at': certificate.updated_at,
+        'anchor': anchor,
+        'certificate': {
+            'id': certificate.certificate_id,
+            'title': certificate.title,
+            'description': certificate.description,
+            'certificate_type': str(certificate.get_certificate_type_display()),
+            'holder_name': holder.full_name,
+            'holder_email': holder.email,
+            'institution_name': certificate.institution_name,
+            'institution_address': certificate.institution_address,
+            'degree': certificate.degree,
+            'field_of_study': certificate.field_of_study,
+            'grade': certificate.grade,
+            'issue_date': certificate.issue_date,
+            'expiry_date': certificate.expiry_date,
+            'status': str(certificate.get_status_display()),
+            'blockchain_hash': certificate.blockchain_hash,
+            'blockchain_transaction': certificate.blockchain_transaction,
+            'qr_code': certificate.qr_code.url if certificate.qr_code else None,
+            'certificate_file': certificate.certificate_file.url if certificate.certificate_file else None,
+        },
+    }
+
+
+def get_verification_entry(certificate_id=None, blockchain_hash=None):
+    """Return the cached payload for a certificate ID or hash, or None"""
+    key = _id_key(certificate_id) if certificate_id else _hash_key(blockchain_hash)
+    return cache.get(key, version=settings.VERIFICATION_CACHE_VERSION)
+
+
+def get_verification_entries(certificate_ids=(), blockchain_hashes=()):
+    """Cached payloads of many certificates in one round trip, as ({certificate_id: entry}, {hash: entry})"""
+    keys = {_id_key(certificate_id): ('id', certificate_id) for certificate_id in certificate_ids}
+    keys.update({_hash_key(blockchain_hash): ('hash', blockchain_hash) for blockchain_hash in blockchain_hashes})
+    found = cache.get_many(keys, version=settings.VERIFICATION_CACHE_VERSION)
+
+    by_id, by_hash = {}, {}
+    for key, entry in found.items():
+        kind, value = keys[key]
+        (by_id if kind == 'id' else by_hash)[value] = entry
+    return by_id, by_hash
+
+
+def cache_verification_entry(certificate):
+    """Build the payload for a certificate and store it under both lookup keys"""
+    return cache_verification_entries([certificate])[0]
+
+
+def cache_verification_entries(certificates):
+    """cache_verification_entry for many certificates, with one anchor query and one cache write"""
+    anchors = certificate_anchors([certificate.pk for certificate in certificates])
+    entries = []
+    keys = {}
+    for certificate in certificates:
+        entry = build_verification_entry(certificate, anchors)
+        entries.append(entry)
+        keys[_id_key(certificate.certificate_id)] = entry
+        if certificate.blockchain_hash:
+            keys[_hash_key(certificate.blockchain_hash)] = entry
+    if keys:
+        cache.set_many(
+            keys,
+            timeout=settings.VERIFICATION_CACHE_TIMEOUT,
+            version=settings.VERIFICATION_CACHE_VERSION,
+        )
+    return entries
+
+
+def invalidate_verification_entry(certificate):
+    """Drop the cached payload of a certificate after it has changed"""
+    invalidate_verification_keys([(certificate.certificate_id, certificate.blockchain_hash)])
+
+
+def invalidate_verification_keys(certificates):
+    """Drop the cached payloads of (certificate_id, blockchain_hash) pairs"""
+    keys = []
+    for certificate_id, blockchain_hash in certificates:
+        if certificate_id:
+            keys.append(_id_key(certificate_id))
+        if blockchain_hash:
+            keys.append(_hash_key(blockchain_hash))
+    if keys:
+        cache.delete_many(keys, version=settings.VERIFICATION_CACHE_VERSION)
+
+
+def invalidate_user_verification_entries(user_id):
+    """Drop the cached payloads of every certificate a user holds or issued"""
+    rows = Certificate.objects.filter(Q(holder=user_id) | Q(issuer=user_id)).values_list(
+        'certificate_id', 'blockchain_hash'
+    ).iterator(chunk_size=INVALIDATE_BATCH_SIZE)
+    while batch := list(islice(rows, INVALIDATE_BATCH_SIZE)):
+        invalidate_verification_keys(batch)
@@ -0,0 +1,217 @@
+"""
+Negative lookup filter for the public verification endpoints.
+
+A Bloom filter over every certificate_id and blockchain_hash, kept as a Redis
+bitmap. A lookup the filter has never seen is answered "not found" without a
+database query; a positive answer may be false (about
+CERTIFICATE_FILTER_ERROR_RATE of unknown values) and falls through to the
+database as before.
+
+Certificates are added when they are created; if that fails the filter is
+dropped (and rebuilt in the background) rather than left without them, since
+a false "not found" is never acceptable. A Bloom filter cannot remove
+values, so deleted certificates stay "maybe present" until the next rebuild
+(the ``rebuild_certificate_filter`` command, also run nightly). The filter
+size is part of the key: until a filter with the configured size has been
+built, and whenever Redis is unavailable, every lookup falls through to the
+database.
+
+Failed lookups are counted per day in a Redis hash instead of being written
+as log rows.
+"""
+import hashlib
+import logging
+import math
+import uuid
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MISS_COUNTER_TIMEOUT = timedelta(days=30)
+REBUILD_OVERLAP = timedelta(minutes=10)
+
+_redis_client = None
+
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.CERTIFICATE_FILTER_REDIS_URL)
+    return _redis_client
+
+
+def filter_size():
+    """(bits, hash functions) for CERTIFICATE_FILTER_CAPACITY at CERTIFICATE_FILTER_ERROR_RATE"""
+    capacity = settings.CERTIFICATE_FILTER_CAPACITY
+    error_rate = settings.CERTIFICATE_FILTER_ERROR_RATE
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    return bits, max(1, round(bits / capacity * math.log(2)))
+
+
+def filter_key():
+    bits, hashes = filter_size()
+    return f'certifynow:certificate-filter:{bits}:{hashes}'
+
+
+def _positions(value, bits, hashes):
+    digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+    first = int.from_bytes(digest[:8], 'big')
+    step = int.from_bytes(digest[8:], 'big') | 1
+    return [(first + i * step) % bits for i in range(hashes)]
+
+
+def _members(certificate_ids=(), blockchain_hashes=()):
+    return [f'id:{value}' for value in certificate_ids] + [f'hash:{value}' for value in blockchain_hashes]
+
+
+def _set_bits(pipeline, key, members):
+    bits, hashes = filter_size()
+    for member in members:
+        for position in _positions(member, bits, hashes):
+            pipeline.setbit(key, position, 1)
+
+
+def _add(client, key, certificates):
+    members = _members(
+        [certificate_id for certificate_id, _ in certificates if certificate_id],
+        [blockchain_hash for _, blockchain_hash in certificates if blockchain_hash],
+    )
+    pipeline = client.pipeline(transaction=False)
+    _set_bits(pipeline, key, members)
+    pipeline.execute()
+    return len(members)
+
+
+def add_certificates(certificates):
+    """Add (certificate_id, blockchain_hash) pairs to the filter, if it has been built"""
+    if not certificates:
+        return
+    try:
+        client = get_redis()
+        key = filter_key()
+        # A missing filter means "not built yet"; setting bits would create a partial one
+        if client.exists(key):
+            _add(client, key, certificates)
+    except redis.RedisError:
+        # A filter without these certificates would report them as unknown
+        logger.exception('Could not add %d certificates to the certificate filter, dropping it', len(certificates))
+        drop_filter()
+
+
+def drop_filter():
+    """Make every lookup fall through to the database until the filter is rebuilt"""
+    from verification.tasks import drop_certificate_filter, rebuild_certificate_filter
+    try:
+        get_redis().delete(filter_key())
+        rebuild_certificate_filter.delay()
+    except redis.RedisError:
+        logger.exception('Could not drop the certificate filter, retrying in a task')
+        try:
+            drop_certificate_filter.delay()
+        except Exception:
+            logger.critical('Certificate filter may be missing certificates; run rebuild_certificate_filter')
+
+
+def unknown_identifiers(certificate_ids=(), blockchain_hashes=()):
+    """The certificate ids and hashes that certainly do not exist, as (ids, hashes)"""
+    certificate_ids = list(certificate_ids)
+    blockchain_hashes = list(blockchain_hashes)
+    members = _members(certificate_ids, blockchain_hashes)
+    if not members:
+        return set(), set()
+
+    bits, hashes = filter_size()
+    key = filter_key()
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        pipeline.exists(key)
+        for member in members:
+            for position in _positions(member, bits, hashes):
+                pipeline.getbit(key, position)
+        ready, *values = pipeline.execute()
+    except redis.RedisError:
+        logger.exception('Certificate filter unavailable, falling back to the database')
+        return set(), set()
+    if not ready:
+        return set(), set()
+
+    unknown = {
+        member for index, member in enumerate(members)
+        if not all(values[index * hashes:(index + 1) * hashes])
+    }
+    return (
+        {value for value in certificate_ids if f'id:{value}' in unknown},
+        {value for value in blockchain_hashes if f'hash:{value}' in unknown},
+    )
+
+
+def is_unknown(certificate_id=None, blockchain_hash=None):
+    """Whether the certificate id (or, without one, the hash) certainly does not exist"""
+    if certificate_id:
+        return bool(unknown_identifiers(certificate_ids=[certificate_id])[0])
+    return bool(unknown_identifiers(blockchain_hashes=[blockchain_hash])[1])
+
+
+def rebuild(chunk_size=None):
+    """Build a fresh filter from the database and swap it in; returns the number of certificates"""
+    from certificates.models import Certificate
+
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    client = get_redis()
+    key = filter_key()
+    building = f'{key}:rebuild:{uuid.uuid4().hex}'
+    started_at = timezone.now()
+
+    count = 0
+    try:
+        pipeline = client.pipeline(transaction=False)
+        # An empty filter still has to exist to be "ready"
+        pipeline.setbit(building, 0, 0)
+        rows = Certificate.objects.values_list('certificate_id', 'blockchain_hash').iterator(chunk_size=chunk_size)
+        for certificate_id, blockchain_hash in rows:
+            _set_bits(pipeline, building, _members([certificate_id], [blockchain_hash] if blockchain_hash else []))
+            count += 1
+            if count % chunk_size == 0:
+                pipeline.execute()
+        pipeline.execute()
+        client.rename(building, key)
+    except Exception:
+        client.delete(building)
+        raise
+
+    # Certificates committed while the rebuild ran may have been missed by the
+    # scan and added to the old filter only
+    recent = Certificate.objects.filter(
+        created_at__gte=started_at - REBUILD_OVERLAP
+    ).values_list('certificate_id', 'blockchain_hash')
+    _add(client, key, list(recent))
+    return count
+
+
+def _miss_key(day):
+    return f'certifynow:verification-misses:{day.isoformat()}'
+
+
+def record_failed_lookup(method, reason):
+    """Count a lookup of an unknown certificate; ``reason`` is 'filtered' or 'missing'"""
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        key = _miss_key(timezone.localdate())
+        pipeline.hincrby(key, f'{method}:{reason}', 1)
+        pipeline.expire(key, MISS_COUNTER_TIMEOUT)
+        pipeline.execute()
+    except redis.RedisError:
+        logger.warning('Could not count a failed verification lookup')
+
+
+def failed_lookup_counts(day=None):
+    """{'<method>:<reason>': count} of a day (today by default)"""
+    try:
+        counts = get_redis().hgetall(_miss_key(day or timezone.localdate()))
+    except redis.RedisError:
+        return {}
+    return {field.decode(): int(value) for field, value in counts.items()}
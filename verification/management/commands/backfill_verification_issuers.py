@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+from certificates.models import Certificate
+from verification.models import VerificationRequest
+
+
+class Command(BaseCommand):
+    help = 'Copy certificate.issuer onto verification requests recorded before the issuer column existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows updated per statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        certificate_issuer = Certificate.objects.filter(pk=OuterRef('certificate_id')).values('issuer')[:1]
+        missing = VerificationRequest.objects.filter(issuer__isnull=True).order_by('pk')
+
+        updated = 0
+        while True:
+            ids = list(missing.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            updated += VerificationRequest.objects.filter(pk__in=ids).update(issuer=Subquery(certificate_issuer))
+            self.stdout.write(f'{updated} verification requests updated')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled issuer on {updated} verification requests'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from verification import lookup_filter
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the negative lookup filter of certificate IDs and blockchain hashes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched and written to Redis per round trip')
+
+    def handle(self, *args, **options):
+        bits, hashes = lookup_filter.filter_size()
+        self.stdout.write(f'Building a {bits // 8 // 1024} KiB filter with {hashes} hash functions')
+        count = lookup_filter.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Certificate filter rebuilt from {count} certificates'))
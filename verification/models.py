@@ -1,20 +1,29 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from certificates.models import Certificate
+import uuid
 
 User = get_user_model()
 
 
 class VerificationRequest(models.Model):
+    reference = models.UUIDField(_('Tekshiruv raqami'), default=uuid.uuid4, editable=False, db_index=True)
     certificate = models.ForeignKey(Certificate, on_delete=models.CASCADE, related_name='verification_requests')
+    # Copy of certificate.issuer so an issuer's history is one (issuer, verification_date) index range
+    issuer = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True, db_index=False,
+        related_name='received_verification_requests'
+    )
     requester_ip = models.GenericIPAddressField(_('So\'rovchi IP'))
     requester_user_agent = models.TextField(_('User Agent'), blank=True)
     requester_email = models.EmailField(_('So\'rovchi email'), blank=True)
     requester_organization = models.CharField(_('So\'rovchi tashkilot'), max_length=255, blank=True)
 
     verification_result = models.BooleanField(_('Tekshiruv natijasi'), default=True)
-    verification_date = models.DateTimeField(_('Tekshiruv vaqti'), auto_now_add=True)
+    # Set when the request is made, not when the buffered audit record is written
+    verification_date = models.DateTimeField(_('Tekshiruv vaqti'), default=timezone.now)
 
     # Additional verification details
     verification_method = models.CharField(_('Tekshiruv usuli'), max_length=50, default='web')  # web, api, qr
@@ -24,6 +33,11 @@ class VerificationRequest(models.Model):
         verbose_name = _('Tekshiruv so\'rovi')
         verbose_name_plural = _('Tekshiruv so\'rovlari')
         ordering = ['-verification_date']
+        indexes = [
+            models.Index(fields=['certificate', 'verification_date']),
+            models.Index(fields=['verification_date']),
+            models.Index(fields=['issuer', 'verification_date', 'id']),
+        ]
 
 
 class VerificationLog(models.Model):
@@ -39,7 +53,7 @@ class VerificationLog(models.Model):
     action = models.CharField(_('Harakat'), max_length=20, choices=ACTION_CHOICES)
     ip_address = models.GenericIPAddressField(_('IP manzil'))
     user_agent = models.TextField(_('User Agent'), blank=True)
-    timestamp = models.DateTimeField(_('Vaqt'), auto_now_add=True)
+    timestamp = models.DateTimeField(_('Vaqt'), default=timezone.now)
 
     # Additional context
     details = models.JSONField(_('Tafsilotlar'), default=dict, blank=True)
@@ -48,3 +62,7 @@ class VerificationLog(models.Model):
         verbose_name = _('Tekshiruv logi')
         verbose_name_plural = _('Tekshiruv loglari')
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['certificate', 'timestamp']),
+            models.Index(fields=['timestamp', 'id']),
+        ]
@@ -1,10 +1,12 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import VerificationRequest, VerificationLog
-from certificates.serializers import CertificateSerializer
+from certificates.serializers import CertificateSummarySerializer
+from certifynow.serializers import SparseFieldsetMixin
 
 
-class VerificationRequestSerializer(serializers.ModelSerializer):
-    certificate = CertificateSerializer(read_only=True)
+class VerificationRequestSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    certificate = CertificateSummarySerializer(read_only=True)
 
     class Meta:
         model = VerificationRequest
@@ -12,8 +14,8 @@ class VerificationRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ['verification_date', 'verification_result']
 
 
-class VerificationLogSerializer(serializers.ModelSerializer):
-    certificate = CertificateSerializer(read_only=True)
+class VerificationLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    certificate = CertificateSummarySerializer(read_only=True)
 
     class Meta:
         model = VerificationLog
@@ -39,6 +41,28 @@ class CertificateVerifySerializer(serializers.Serializer):
         return attrs
 
 
+class VerificationItemSerializer(serializers.Serializer):
+    certificate_id = serializers.CharField(max_length=50, required=False)
+    certificate_hash = serializers.CharField(max_length=255, required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('certificate_id') and not attrs.get('certificate_hash'):
+            raise serializers.ValidationError(
+                'certificate_id yoki certificate_hash dan biri talab qilinadi'
+            )
+        return attrs
+
+
+class BatchVerifySerializer(serializers.Serializer):
+    items = serializers.ListField(
+        child=VerificationItemSerializer(),
+        allow_empty=False,
+        max_length=settings.VERIFICATION_BATCH_MAX_ITEMS
+    )
+    requester_email = serializers.EmailField(required=False)
+    requester_organization = serializers.CharField(max_length=255, required=False)
+
+
 class QRVerificationSerializer(serializers.Serializer):
     """Serializer for QR code verification response"""
     is_valid = serializers.BooleanField()
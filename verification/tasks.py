@@ -0,0 +1,43 @@
+import socket
+
+import redis
+from celery import shared_task
+from celery.signals import worker_shutdown
+from django.conf import settings
+
+from verification import audit, lookup_filter
+
+
+@shared_task
+def write_audit_batch(records):
+    """Write a batch of buffered audit records"""
+    return audit.write_records(records)
+
+
+@shared_task
+def drain_audit_stream():
+    """Drain the Redis audit stream into the database"""
+    if settings.VERIFICATION_AUDIT_MODE != 'stream':
+        return 0
+    return audit.drain_stream(consumer=socket.gethostname())
+
+
+@shared_task(autoretry_for=(redis.RedisError,), retry_backoff=True, max_retries=None)
+def drop_certificate_filter():
+    """Drop a filter that missed new certificates, then rebuild it"""
+    lookup_filter.get_redis().delete(lookup_filter.filter_key())
+    rebuild_certificate_filter.delay()
+
+
+@shared_task
+def rebuild_certificate_filter():
+    """Rebuild the negative lookup filter, dropping deleted certificates"""
+    return lookup_filter.rebuild()
+
+
+@worker_shutdown.connect
+def flush_audit_on_shutdown(**kwargs):
+    """Write out buffered and queued audit records before the worker stops"""
+    audit.flush_buffer()
+    if settings.VERIFICATION_AUDIT_MODE == 'stream':
+        audit.drain_stream(consumer=socket.gethostname(), max_batches=10)
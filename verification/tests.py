@@ -0,0 +1,209 @@
+import unittest
+from datetime import datetime, time, timedelta
+from unittest import mock
+
+import redis
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from certificates.models import Certificate
+from certifynow.testing import TEST_CACHES, create_certificate, create_user
+from verification import lookup_filter
+from verification.cache import cache_verification_entry, get_verification_entry
+from verification.models import VerificationLog, VerificationRequest
+
+User = get_user_model()
+
+
+@override_settings(CACHES=TEST_CACHES, QR_CODE_SYNC=False)
+class VerificationListQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.holder = create_user('student')
+        self.issuer = create_user('admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.holder)
+        for _ in range(10):
+            certificate = create_certificate(self.holder, self.issuer)
+            VerificationRequest.objects.create(
+                certificate=certificate, issuer=self.issuer, requester_ip='127.0.0.1'
+            )
+            VerificationLog.objects.create(certificate=certificate, action='verify', ip_address='127.0.0.1')
+
+    def assertConstantQueries(self, url):
+        """The query count of ``url`` is the same for a page of 2 rows and a page of 10"""
+        self.client.get(f'{url}page_size=2')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'{url}page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(f'{url}page_size=10')
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_verification_logs(self):
+        self.assertConstantQueries('/api/v1/verification/logs/?')
+
+    def test_verification_logs_expanded(self):
+        self.assertConstantQueries('/api/v1/verification/logs/?expand=holder,issuer&')
+
+    def test_verification_history(self):
+        self.assertConstantQueries('/api/v1/verification/history/?')
+
+    def test_verification_history_expanded(self):
+        self.assertConstantQueries('/api/v1/verification/history/?expand=holder,issuer&')
+
+    def test_history_date_to_includes_the_whole_day(self):
+        day = timezone.localdate() - timedelta(days=1)
+        late = timezone.make_aware(datetime.combine(day, time(23, 30)))
+        VerificationRequest.objects.update(verification_date=late + timedelta(days=1))
+        VerificationRequest.objects.filter(pk=VerificationRequest.objects.first().pk).update(verification_date=late)
+
+        for date_to, expected in ((day, 1), (day - timedelta(days=1), 0), (late.isoformat(), 0)):
+            with self.subTest(date_to=date_to):
+                response = self.client.get('/api/v1/verification/history/', {'date_to': str(date_to)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), expected)
+
+
+@override_settings(
+    CACHES=TEST_CACHES, QR_CODE_SYNC=False, VERIFICATION_AUDIT_MODE='sync', VERIFICATION_QR_BEACON=False
+)
+class QRVerificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.certificate = create_certificate(create_user('student'), create_user('admin'), is_verified=True)
+        self.url = f'/api/v1/verification/verify-qr/{self.certificate.blockchain_hash}/'
+        self.client = APIClient()
+
+    def test_unchanged_certificate_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_valid'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_follows_the_body(self):
+        etag = self.client.get(self.url)['ETag']
+
+        # A QR code rendered later changes the body without touching updated_at
+        Certificate.objects.filter(pk=self.certificate.pk).update(qr_code='qr_codes/qr.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.certificate.invalidate_verification_cache()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertTrue(response.data['certificate']['qr_code'].endswith('qr_codes/qr.png'))
+
+
+@override_settings(CACHES=TEST_CACHES, QR_CODE_SYNC=False)
+class VerificationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.holder = create_user('student')
+        self.issuer = create_user('admin')
+        certificate = create_certificate(self.holder, self.issuer)
+        self.certificate = Certificate.objects.select_related('holder', 'issuer').get(pk=certificate.pk)
+        cache_verification_entry(self.certificate)
+
+    def entry(self):
+        return get_verification_entry(certificate_id=self.certificate.certificate_id)
+
+    def test_renaming_the_holder_drops_the_entry(self):
+        holder = User.objects.get(pk=self.holder.pk)
+        holder.first_name = 'Yangi'
+        with self.captureOnCommitCallbacks(execute=True):
+            holder.save()
+        self.assertIsNone(self.entry())
+        self.assertIsNone(get_verification_entry(blockchain_hash=self.certificate.blockchain_hash))
+
+    def test_changing_the_issuer_email_drops_the_entry(self):
+        issuer = User.objects.get(pk=self.issuer.pk)
+        issuer.email = 'yangi@example.com'
+        with self.captureOnCommitCallbacks(execute=True):
+            issuer.save()
+        self.assertIsNone(self.entry())
+
+    def test_certificate_changes_drop_the_entry_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.certificate.title = 'Yangi sarlavha'
+            self.certificate.save()
+            # A reader before the commit would cache the old row again, so nothing is dropped yet
+            self.assertIsNotNone(self.entry())
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(self.entry())
+
+    def test_unrelated_changes_keep_the_entry(self):
+        holder = User.objects.get(pk=self.holder.pk)
+        holder.phone = '+998901234567'
+        with self.captureOnCommitCallbacks(execute=True):
+            holder.save()
+        self.assertIsNotNone(self.entry())
+
+
+class RedisTestCase(TestCase):
+    """Skipped when the Redis server behind the lookup filter is not reachable"""
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            lookup_filter.get_redis().ping()
+        except redis.RedisError:
+            raise unittest.SkipTest('Redis is not available')
+        super().setUpClass()
+
+
+# A small filter gets a key of its own, apart from the one a running site uses
+@override_settings(CACHES=TEST_CACHES, QR_CODE_SYNC=False, CERTIFICATE_FILTER_CAPACITY=1000)
+class LookupFilterTests(RedisTestCase):
+    def setUp(self):
+        cache.clear()
+        lookup_filter.get_redis().delete(lookup_filter.filter_key())
+        self.addCleanup(lookup_filter.get_redis().delete, lookup_filter.filter_key())
+        self.holder = create_user('student')
+        self.issuer = create_user('admin')
+
+    def test_no_lookup_is_filtered_before_the_first_build(self):
+        self.assertFalse(lookup_filter.is_unknown(certificate_id='CERT-MISSING'))
+
+    def test_rebuild_covers_every_certificate(self):
+        certificates = [create_certificate(self.holder, self.issuer) for _ in range(5)]
+        self.assertEqual(lookup_filter.rebuild(chunk_size=2), 5)
+
+        ids, hashes = lookup_filter.unknown_identifiers(
+            [certificate.certificate_id for certificate in certificates],
+            [certificate.blockchain_hash for certificate in certificates],
+        )
+        self.assertEqual((ids, hashes), (set(), set()))
+        self.assertTrue(lookup_filter.is_unknown(certificate_id='CERT-MISSING'))
+        self.assertTrue(lookup_filter.is_unknown(blockchain_hash='0' * 64))
+
+    def test_rebuild_replaces_the_previous_filter(self):
+        old = create_certificate(self.holder, self.issuer)
+        lookup_filter.rebuild()
+        old.delete()
+        lookup_filter.rebuild()
+        self.assertTrue(lookup_filter.is_unknown(certificate_id=old.certificate_id))
+
+    @mock.patch('certificates.tasks.generate_certificate_qr.delay')
+    def test_new_certificates_are_added_on_commit(self, generate_qr):
+        lookup_filter.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            certificate = create_certificate(self.holder, self.issuer)
+        self.assertFalse(lookup_filter.is_unknown(certificate_id=certificate.certificate_id))
+
+    def test_filtered_lookup_skips_the_database(self):
+        lookup_filter.rebuild()
+        with self.assertNumQueries(0):
+            response = APIClient().post(
+                '/api/v1/verification/verify/', {'certificate_id': 'CERT-MISSING'}, format='json'
+            )
+        self.assertEqual(response.data['error_code'], 'CERTIFICATE_NOT_FOUND')
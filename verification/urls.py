@@ -1,13 +1,15 @@
 from django.urls import path
 from .views import (
-    verify_certificate, verify_by_qr, verification_history,
-    VerificationLogListView, verification_stats
+    verify_certificate, verify_certificates_batch, verify_by_qr, verification_history,
+    VerificationLogListView, VerificationLogExportView, verification_stats
 )
 
 urlpatterns = [
     path('verify/', verify_certificate, name='verify-certificate'),
+    path('verify/batch/', verify_certificates_batch, name='verify-certificates-batch'),
     path('verify-qr/<str:qr_hash>/', verify_by_qr, name='verify-by-qr'),
     path('history/', verification_history, name='verification-history'),
     path('logs/', VerificationLogListView.as_view(), name='verification-logs'),
+    path('logs/export/', VerificationLogExportView.as_view(), name='verification-logs-export'),
     path('stats/', verification_stats, name='verification-stats'),
 ]
@@ -1,3 +1,10 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
 def get_client_ip(request):
     """Get client IP address from request"""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -10,3 +17,31 @@ def get_client_ip(request):
 def get_user_agent(request):
     """Get user agent from request"""
     return request.META.get('HTTP_USER_AGENT', '')
+
+def get_date_range(request):
+    """Parse ?date_from= and ?date_to= as dates or datetimes.
+
+    Returns (start, end) bounds for ``>= start`` and ``< end``; a plain date in
+    date_to includes that whole day. Raises ValidationError on bad values.
+    """
+    bounds = []
+    for name, day_offset in (('date_from', 0), ('date_to', 1)):
+        value = request.query_params.get(name)
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            # Dates first: parse_datetime also accepts a bare date, as midnight
+            day = parse_date(value)
+            if day is not None:
+                moment = datetime.combine(day + timedelta(days=day_offset), time.min)
+            else:
+                moment = parse_datetime(value)
+                if moment is None:
+                    raise ValueError
+        except ValueError:
+            raise ValidationError({name: 'Sana noto\'g\'ri: YYYY-MM-DD yoki ISO 8601 formatida bering'})
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        bounds.append(moment)
+    return tuple(bounds)
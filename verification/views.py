@@ -1,3 +1,11 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -6,10 +14,58 @@ from verification.models import VerificationRequest, VerificationLog
 from verification.serializers import (
     VerificationRequestSerializer,
     VerificationLogSerializer,
-    CertificateVerifySerializer)
-from verification.utils import get_client_ip, get_user_agent
+    CertificateVerifySerializer,
+    BatchVerifySerializer)
+from verification.audit import (
+    log_verification_request, log_verification,
+    verification_request_record, verification_log_record, enqueue_many)
+from verification.cache import (
+    get_verification_entry, cache_verification_entry,
+    get_verification_entries, cache_verification_entries)
+from verification.lookup_filter import is_unknown, unknown_identifiers, record_failed_lookup, failed_lookup_counts
+from verification.utils import get_client_ip, get_user_agent, get_date_range
+from accounts.access import get_access_scope
+from analytics.services import verification_counts
+from blockchain.anchoring import head_block_number
+from certifynow.exports import FORMATS, export_response
+from certifynow.pagination import KeysetPagination, TimestampKeysetPagination
+from certifynow.serializers import query_param_list
 from drf_spectacular.utils import (extend_schema, OpenApiResponse, OpenApiParameter)
 
+
+def certificate_relations(request):
+    """select_related paths for a nested certificate summary and its ?expand= users"""
+    expanded = sorted(query_param_list(request, 'expand') & {'holder', 'issuer'})
+    return ['certificate'] + [f'certificate__{name}' for name in expanded]
+
+
+class VerificationHistoryPagination(KeysetPagination):
+    ordering = ('-verification_date', '-id')
+
+
+def certificate_payload(request, entry):
+    """Cached certificate data of a verification entry with absolute file URLs"""
+    certificate_data = dict(entry['certificate'])
+    for field in ('qr_code', 'certificate_file'):
+        if certificate_data[field]:
+            certificate_data[field] = request.build_absolute_uri(certificate_data[field])
+    return certificate_data
+
+
+def blockchain_section(anchor):
+    """Anchor of a verified certificate with its confirmations against the current head block"""
+    if anchor is None:
+        # Issued but not yet packed into a block
+        return {'network': 'Ethereum Testnet', 'anchored': False, 'confirmations': 0, 'block_number': None}
+    head = head_block_number()
+    return {
+        'network': 'Ethereum Testnet',
+        'anchored': True,
+        'confirmations': head - anchor['block_number'] + 1 if head is not None else 0,
+        **anchor,
+    }
+
+
 @extend_schema(
     summary="Verify Certificate",
     description="Verify a certificate by ID or blockchain hash (QR). Returns certificate info if valid.",
@@ -31,15 +87,11 @@ def verify_certificate(request):
     certificate_id = serializer.validated_data.get('certificate_id')
     certificate_hash = serializer.validated_data.get('certificate_hash')
 
-    certificate = None
-
     try:
-        # Try to find certificate by ID first
         if certificate_id:
-            certificate = Certificate.objects.get(certificate_id=certificate_id)
-        # If hash is provided, verify by blockchain hash
+            entry = get_verification_entry(certificate_id=certificate_id)
         elif certificate_hash:
-            certificate = Certificate.objects.get(blockchain_hash=certificate_hash)
+            entry = get_verification_entry(blockchain_hash=certificate_hash)
         else:
             return Response({
                 'is_valid': False,
@@ -47,111 +99,225 @@ def verify_certificate(request):
                 'error_code': 'MISSING_IDENTIFIER'
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        if entry is None:
+            if is_unknown(certificate_id, certificate_hash):
+                record_failed_lookup('qr' if certificate_hash else 'web', 'filtered')
+                return certificate_not_found(certificate_id)
+            certificates = Certificate.objects.select_related('holder', 'issuer')
+            # Try to find certificate by ID first
+            if certificate_id:
+                certificate = certificates.get(certificate_id=certificate_id)
+            # If hash is provided, verify by blockchain hash
+            else:
+                certificate = certificates.get(blockchain_hash=certificate_hash)
+            entry = cache_verification_entry(certificate)
+
         # Verify certificate hash integrity
-        expected_hash = certificate.generate_blockchain_hash()
-        if certificate.blockchain_hash != expected_hash:
+        if not entry['hash_verified']:
             return Response({
                 'is_valid': False,
                 'message': 'Sertifikat hash buzilgan yoki o\'zgartirilgan',
                 'error_code': 'HASH_MISMATCH'
             })
 
+        verification_method = 'qr' if certificate_hash else 'web'
+
         # Create verification request
-        verification_request = VerificationRequest.objects.create(
-            certificate=certificate,
+        verification_id, verification_date = log_verification_request(
+            entry['pk'],
+            issuer_id=entry['issuer_pk'],
             requester_ip=get_client_ip(request),
             requester_user_agent=get_user_agent(request),
             requester_email=serializer.validated_data.get('requester_email', ''),
             requester_organization=serializer.validated_data.get('requester_organization', ''),
-            verification_result=certificate.status == 'issued' and certificate.is_verified,
-            verification_method='qr' if certificate_hash else 'web'
+            verification_result=entry['is_valid'],
+            verification_method=verification_method
         )
 
         # Create verification log
-        VerificationLog.objects.create(
-            certificate=certificate,
+        log_verification(
+            entry['pk'],
             user=request.user if request.user.is_authenticated else None,
             action='verify',
             ip_address=get_client_ip(request),
             user_agent=get_user_agent(request),
             details={
-                'certificate_id': certificate.certificate_id,
-                'certificate_hash': certificate.blockchain_hash,
-                'verification_method': 'qr' if certificate_hash else 'web',
-                'verification_request_id': str(verification_request.id)
+                'certificate_id': entry['certificate_id'],
+                'certificate_hash': entry['blockchain_hash'],
+                'verification_method': verification_method,
+                'verification_request_id': verification_id
             }
         )
 
         # Prepare response data
-        if verification_request.verification_result:
+        if entry['is_valid']:
             response_data = {
                 'is_valid': True,
-                'certificate': {
-                    'id': certificate.certificate_id,
-                    'title': certificate.title,
-                    'description': certificate.description,
-                    'certificate_type': certificate.get_certificate_type_display(),
-                    'holder_name': certificate.holder.full_name,
-                    'holder_email': certificate.holder.email,
-                    'institution_name': certificate.institution_name,
-                    'institution_address': certificate.institution_address,
-                    'degree': certificate.degree,
-                    'field_of_study': certificate.field_of_study,
-                    'grade': certificate.grade,
-                    'issue_date': certificate.issue_date,
-                    'expiry_date': certificate.expiry_date,
-                    'status': certificate.get_status_display(),
-                    'blockchain_hash': certificate.blockchain_hash,
-                    'blockchain_transaction': certificate.blockchain_transaction,
-                    'qr_code': request.build_absolute_uri(certificate.qr_code.url) if certificate.qr_code else None,
-                    'certificate_file': request.build_absolute_uri(
-                        certificate.certificate_file.url) if certificate.certificate_file else None,
-                },
+                'certificate': certificate_payload(request, entry),
                 'verification': {
-                    'verification_date': verification_request.verification_date,
-                    'verification_id': str(verification_request.id),
-                    'verification_method': verification_request.verification_method,
+                    'verification_date': verification_date,
+                    'verification_id': verification_id,
+                    'verification_method': verification_method,
                     'hash_verified': True,
                 },
-                'blockchain': {
-                    'network': 'Ethereum Testnet',
-                    'confirmations': 1234,
-                    'block_number': 12345678,
-                    'gas_used': 21000,
-                }
+                'blockchain': blockchain_section(entry['anchor']),
             }
         else:
             response_data = {
                 'is_valid': False,
                 'message': 'Sertifikat bekor qilingan yoki hali tasdiqlanmagan',
-                'certificate_id': certificate.certificate_id,
+                'certificate_id': entry['certificate_id'],
                 'error_code': 'CERTIFICATE_INVALID'
             }
 
         return Response(response_data)
 
     except Certificate.DoesNotExist:
-        # Create failed verification log
-        VerificationLog.objects.create(
-            certificate=None,
-            user=request.user if request.user.is_authenticated else None,
-            action='verify',
-            ip_address=get_client_ip(request),
-            user_agent=get_user_agent(request),
-            details={
+        # Unknown identifiers are only counted; VerificationLog needs a certificate
+        record_failed_lookup('qr' if certificate_hash else 'web', 'missing')
+        return certificate_not_found(certificate_id)
+
+
+def certificate_not_found(certificate_id):
+    return Response({
+        'is_valid': False,
+        'message': 'Sertifikat topilmadi',
+        'certificate_id': certificate_id or 'Unknown',
+        'error_code': 'CERTIFICATE_NOT_FOUND'
+    })
+
+
+@extend_schema(
+    summary="Verify Certificates in Batch",
+    description="Verify up to VERIFICATION_BATCH_MAX_ITEMS certificates by ID or blockchain hash in one request. "
+                "Results are returned in the order of the items.",
+    request=BatchVerifySerializer,
+    responses={
+        200: OpenApiResponse(description="Per-item verification results"),
+        400: OpenApiResponse(description="Invalid input or too many items")
+    },
+    tags=["Verification"]
+)
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def verify_certificates_batch(request):
+    """Verify many certificates with one lookup and one audit write"""
+    serializer = BatchVerifySerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    items = serializer.validated_data['items']
+
+    certificate_ids = {item['certificate_id'] for item in items if item.get('certificate_id')}
+    certificate_hashes = {
+        item['certificate_hash'] for item in items if not item.get('certificate_id')
+    }
+    by_id, by_hash = get_verification_entries(certificate_ids, certificate_hashes)
+
+    # Everything the cache did not have comes from one IN query joined to holder and issuer
+    missing_ids = certificate_ids - by_id.keys()
+    missing_hashes = certificate_hashes - by_hash.keys()
+    unknown_ids, unknown_hashes = unknown_identifiers(missing_ids, missing_hashes)
+    missing_ids -= unknown_ids
+    missing_hashes -= unknown_hashes
+    if missing_ids or missing_hashes:
+        certificates = list(Certificate.objects.select_related('holder', 'issuer').filter(
+            Q(certificate_id__in=missing_ids) | Q(blockchain_hash__in=missing_hashes)
+        ))
+        for certificate, entry in zip(certificates, cache_verification_entries(certificates)):
+            by_id[certificate.certificate_id] = entry
+            if certificate.blockchain_hash:
+                by_hash[certificate.blockchain_hash] = entry
+
+    ip_address = get_client_ip(request)
+    user_agent = get_user_agent(request)
+    user = request.user if request.user.is_authenticated else None
+    records = []
+    results = []
+    for item in items:
+        certificate_id = item.get('certificate_id')
+        certificate_hash = None if certificate_id else item['certificate_hash']
+        entry = by_id.get(certificate_id) if certificate_id else by_hash.get(certificate_hash)
+
+        if entry is None:
+            known = certificate_id not in unknown_ids if certificate_id else certificate_hash not in unknown_hashes
+            record_failed_lookup('qr' if certificate_hash else 'web', 'missing' if known else 'filtered')
+            results.append({
                 'certificate_id': certificate_id,
                 'certificate_hash': certificate_hash,
-                'error': 'Certificate not found',
-                'verification_method': 'qr' if certificate_hash else 'web'
-            }
+                'is_valid': False,
+                'message': 'Sertifikat topilmadi',
+                'error_code': 'CERTIFICATE_NOT_FOUND'
+            })
+            continue
+
+        result = {
+            'certificate_id': entry['certificate_id'],
+            'certificate_hash': entry['blockchain_hash'],
+        }
+        if not entry['hash_verified']:
+            results.append({
+                **result,
+                'is_valid': False,
+                'message': 'Sertifikat hash buzilgan yoki o\'zgartirilgan',
+                'error_code': 'HASH_MISMATCH'
+            })
+            continue
+
+        verification_method = 'qr' if certificate_hash else 'web'
+        record, verification_id, verification_date = verification_request_record(
+            entry['pk'],
+            issuer_id=entry['issuer_pk'],
+            requester_ip=ip_address,
+            requester_user_agent=user_agent,
+            requester_email=serializer.validated_data.get('requester_email', ''),
+            requester_organization=serializer.validated_data.get('requester_organization', ''),
+            verification_result=entry['is_valid'],
+            verification_method=verification_method
         )
+        records.append(record)
+        records.append(verification_log_record(
+            entry['pk'],
+            user=user,
+            action='verify',
+            ip_address=ip_address,
+            user_agent=user_agent,
+            details={
+                'certificate_id': entry['certificate_id'],
+                'certificate_hash': entry['blockchain_hash'],
+                'verification_method': verification_method,
+                'verification_request_id': verification_id,
+                'batch': True
+            }
+        ))
+
+        if entry['is_valid']:
+            results.append({
+                **result,
+                'is_valid': True,
+                'certificate': certificate_payload(request, entry),
+                'verification': {
+                    'verification_date': verification_date,
+                    'verification_id': verification_id,
+                    'verification_method': verification_method,
+                    'hash_verified': True,
+                },
+                'blockchain': blockchain_section(entry['anchor']),
+            })
+        else:
+            results.append({
+                **result,
+                'is_valid': False,
+                'message': 'Sertifikat bekor qilingan yoki hali tasdiqlanmagan',
+                'error_code': 'CERTIFICATE_INVALID'
+            })
+
+    enqueue_many(records)
+
+    return Response({
+        'count': len(results),
+        'valid_count': sum(1 for result in results if result['is_valid']),
+        'results': results,
+    })
 
-        return Response({
-            'is_valid': False,
-            'message': 'Sertifikat topilmadi',
-            'certificate_id': certificate_id or 'Unknown',
-            'error_code': 'CERTIFICATE_NOT_FOUND'
-        })
 
 @extend_schema(
     summary="Verify via QR",
@@ -175,79 +341,137 @@ def verify_certificate(request):
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def verify_by_qr(request, qr_hash):
-    """Verify certificate by QR code hash - GET method for QR scanner apps"""
+    """Verify certificate by QR code hash - GET method for QR scanner apps.
+
+    Responses carry a strong ETag and a short public max-age so nginx and
+    CDNs can serve repeated scans. With VERIFICATION_QR_BEACON the scan is
+    audited by the beacon request nginx mirrors for every scan, cached or
+    not, instead of by the request itself.
+    """
+    beacon = settings.VERIFICATION_QR_BEACON and request.META.get('HTTP_X_VERIFICATION_BEACON') == '1'
+    audit_scan = beacon or not settings.VERIFICATION_QR_BEACON
+
     try:
-        certificate = Certificate.objects.get(blockchain_hash=qr_hash)
+        entry = get_verification_entry(blockchain_hash=qr_hash)
+        if entry is None:
+            if is_unknown(blockchain_hash=qr_hash):
+                if audit_scan:
+                    record_failed_lookup('qr_scan', 'filtered')
+                return qr_response(request, None, qr_certificate_not_found(), beacon)
+            certificate = Certificate.objects.select_related('holder', 'issuer').get(blockchain_hash=qr_hash)
+            entry = cache_verification_entry(certificate)
 
         # Verify hash integrity
-        expected_hash = certificate.generate_blockchain_hash()
-        if certificate.blockchain_hash != expected_hash:
-            return Response({
+        if not entry['hash_verified']:
+            return qr_response(request, entry, Response({
                 'is_valid': False,
                 'message': 'Sertifikat hash buzilgan',
                 'error_code': 'HASH_MISMATCH'
-            })
+            }), beacon)
 
         # Create verification log
-        VerificationLog.objects.create(
-            certificate=certificate,
-            user=None,
-            action='verify',
-            ip_address=get_client_ip(request),
-            user_agent=get_user_agent(request),
-            details={
-                'certificate_id': certificate.certificate_id,
-                'certificate_hash': certificate.blockchain_hash,
-                'verification_method': 'qr_scan'
-            }
-        )
+        if audit_scan:
+            log_verification(
+                entry['pk'],
+                user=None,
+                action='verify',
+                ip_address=get_client_ip(request),
+                user_agent=get_user_agent(request),
+                details={
+                    'certificate_id': entry['certificate_id'],
+                    'certificate_hash': entry['blockchain_hash'],
+                    'verification_method': 'qr_scan'
+                }
+            )
 
-        if certificate.status == 'issued' and certificate.is_verified:
-            return Response({
+        if beacon:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if entry['is_valid']:
+            certificate_data = entry['certificate']
+            response = Response({
                 'is_valid': True,
                 'certificate': {
-                    'id': certificate.certificate_id,
-                    'title': certificate.title,
-                    'holder_name': certificate.holder.full_name,
-                    'institution_name': certificate.institution_name,
-                    'degree': certificate.degree,
-                    'grade': certificate.grade,
-                    'issue_date': certificate.issue_date,
-                    'blockchain_hash': certificate.blockchain_hash,
+                    'id': certificate_data['id'],
+                    'title': certificate_data['title'],
+                    'holder_name': certificate_data['holder_name'],
+                    'institution_name': certificate_data['institution_name'],
+                    'degree': certificate_data['degree'],
+                    'grade': certificate_data['grade'],
+                    'issue_date': certificate_data['issue_date'],
+                    'blockchain_hash': certificate_data['blockchain_hash'],
                     'verification_url': f"{request.build_absolute_uri('/verify')}?hash={qr_hash}",
-                    'qr_code': request.build_absolute_uri(certificate.qr_code.url) if certificate.qr_code else None,
+                    'qr_code': request.build_absolute_uri(certificate_data['qr_code']) if certificate_data['qr_code'] else None,
                 },
                 'verification': {
-                    'verified_at': certificate.updated_at,
+                    'verified_at': entry['updated_at'],
                     'hash_verified': True,
                     'method': 'qr_scan'
                 }
             })
         else:
-            return Response({
+            response = Response({
                 'is_valid': False,
                 'message': 'Sertifikat bekor qilingan yoki tasdiqlanmagan',
                 'error_code': 'CERTIFICATE_INVALID'
             })
 
+        etag = qr_etag(response.data)
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        return qr_response(request, entry, response, beacon, etag)
+
     except Certificate.DoesNotExist:
-        return Response({
-            'is_valid': False,
-            'message': 'Sertifikat topilmadi',
-            'error_code': 'CERTIFICATE_NOT_FOUND'
-        }, status=status.HTTP_404_NOT_FOUND)
+        if audit_scan:
+            record_failed_lookup('qr_scan', 'missing')
+        return qr_response(request, None, qr_certificate_not_found(), beacon)
+
+
+def qr_certificate_not_found():
+    return Response({
+        'is_valid': False,
+        'message': 'Sertifikat topilmadi',
+        'error_code': 'CERTIFICATE_NOT_FOUND'
+    }, status=status.HTTP_404_NOT_FOUND)
+
+
+def qr_etag(data):
+    """Strong ETag of a QR verification response, derived from its body"""
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return quote_etag(hashlib.sha256(body.encode()).hexdigest()[:32])
+
+
+def qr_response(request, entry, response, beacon, etag=None):
+    """Add validators and public cache headers to a verify-qr response"""
+    if beacon:
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    if entry is not None:
+        response['ETag'] = etag or qr_etag(response.data)
+    patch_cache_control(response, public=True, max_age=settings.VERIFICATION_QR_MAX_AGE)
+    return response
+
 
 @extend_schema(
     summary="Verification History",
-    description="Get verification history for the current authenticated user.",
+    description="Get verification history for the current authenticated user, newest first. "
+                "Pages are keyset cursors (follow next/previous). With export=ndjson or export=csv "
+                "the whole filtered history is streamed as a file instead.",
     responses={
         200: OpenApiResponse(response=VerificationRequestSerializer, description="List of verification requests")
     },
     parameters=[
-        OpenApiParameter(name="page", type=int, location=OpenApiParameter.QUERY, required=False),
+        OpenApiParameter(name="cursor", type=str, location=OpenApiParameter.QUERY, required=False),
         OpenApiParameter(name="page_size", type=int, location=OpenApiParameter.QUERY, required=False),
+        OpenApiParameter(name="count", type=str, location=OpenApiParameter.QUERY, required=False,
+                         enum=['estimate', 'exact'], description="Include a total count"),
         OpenApiParameter(name="date_from", type=str, location=OpenApiParameter.QUERY, required=False),
-        OpenApiParameter(name="date_to", type=str, location=OpenApiParameter.QUERY, required=False)
+        OpenApiParameter(name="date_to", type=str, location=OpenApiParameter.QUERY, required=False),
+        OpenApiParameter(name="export", type=str, location=OpenApiParameter.QUERY, required=False,
+                         enum=['ndjson', 'csv'], description="Stream the whole history as a file"),
+        OpenApiParameter(name="fields", type=str, location=OpenApiParameter.QUERY, required=False,
+                         description="Comma separated fields to return"),
+        OpenApiParameter(name="expand", type=str, location=OpenApiParameter.QUERY, required=False,
+                         description="holder,issuer to nest the certificate users")
     ],
     tags=["Verification"]
 )
@@ -255,38 +479,32 @@ def verify_by_qr(request, qr_hash):
 @permission_classes([permissions.IsAuthenticated])
 def verification_history(request):
     """Get verification history for current user"""
-    user = request.user
-
-    if user.role == 'admin':
-        # Admin can see all verifications
-        verifications = VerificationRequest.objects.all()
-    elif user.role == 'organization':
-        # Organization can see verifications for their certificates
-        verifications = VerificationRequest.objects.filter(certificate__issuer=user)
-    else:
-        # Students can see verifications for their certificates
-        verifications = VerificationRequest.objects.filter(certificate__holder=user)
-
-    # Apply pagination and filtering
-    page = request.query_params.get('page', 1)
-    page_size = request.query_params.get('page_size', 20)
+    scope = get_access_scope(request.user)
 
-    # Filter by date range if provided
-    date_from = request.query_params.get('date_from')
-    date_to = request.query_params.get('date_to')
+    # Issuers read their history through the denormalized (issuer, verification_date) index
+    verifications = VerificationRequest.objects.select_related(*certificate_relations(request)).filter(
+        scope.certificate_activity(issuer_field='issuer')
+    )
 
+    # Filter by date range if provided
+    date_from, date_to = get_date_range(request)
     if date_from:
         verifications = verifications.filter(verification_date__gte=date_from)
     if date_to:
-        verifications = verifications.filter(verification_date__lte=date_to)
-
-    verifications = verifications.order_by('-verification_date')[:int(page_size)]
+        verifications = verifications.filter(verification_date__lt=date_to)
+
+    export = request.query_params.get('export')
+    if export in FORMATS:
+        serializer = VerificationRequestSerializer(context={'request': request})
+        return export_response(
+            request, verifications.order_by('-verification_date', '-id'), serializer,
+            'verification-history', file_format=export
+        )
 
-    serializer = VerificationRequestSerializer(verifications, many=True)
-    return Response({
-        'results': serializer.data,
-        'count': verifications.count()
-    })
+    paginator = VerificationHistoryPagination()
+    page = paginator.paginate_queryset(verifications, request)
+    serializer = VerificationRequestSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
 
 @extend_schema(
     summary="Verification Logs",
@@ -298,7 +516,10 @@ def verification_history(request):
         OpenApiParameter(name="action", type=str, location=OpenApiParameter.QUERY, required=False),
         OpenApiParameter(name="certificate__status", type=str, location=OpenApiParameter.QUERY, required=False),
         OpenApiParameter(name="search", type=str, location=OpenApiParameter.QUERY, required=False),
-        OpenApiParameter(name="ordering", type=str, location=OpenApiParameter.QUERY, required=False),
+        OpenApiParameter(name="fields", type=str, location=OpenApiParameter.QUERY, required=False,
+                         description="Comma separated fields to return"),
+        OpenApiParameter(name="expand", type=str, location=OpenApiParameter.QUERY, required=False,
+                         description="holder,issuer to nest the certificate users"),
     ],
     tags=["Verification"]
 )
@@ -308,18 +529,38 @@ class VerificationLogListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['action', 'certificate__status']
     search_fields = ['certificate__title', 'certificate__certificate_id']
-    ordering = ['-timestamp']
+    # Newest first by (timestamp, id) keyset; the feed has no ?ordering=
+    pagination_class = TimestampKeysetPagination
 
     def get_queryset(self):
-        user = self.request.user
+        scope = get_access_scope(self.request.user)
+        return VerificationLog.objects.select_related(*certificate_relations(self.request)).filter(
+            scope.certificate_activity()
+        )
 
-        if user.role == 'admin':
-            return VerificationLog.objects.all()
-        elif user.role == 'organization':
-            return VerificationLog.objects.filter(certificate__issuer=user)
-        else:
-            return VerificationLog.objects.filter(certificate__holder=user)
 
+@extend_schema(
+    summary="Export Verification Logs",
+    description="Stream every verification log visible to the user as CSV or NDJSON. "
+                "Takes the same filters as the log list; gzip is applied when the client accepts it.",
+    parameters=[
+        OpenApiParameter(name="file_format", type=str, location=OpenApiParameter.QUERY, required=False,
+                         enum=['csv', 'ndjson'], description="Default csv"),
+        OpenApiParameter(name="action", type=str, location=OpenApiParameter.QUERY, required=False),
+        OpenApiParameter(name="certificate__status", type=str, location=OpenApiParameter.QUERY, required=False),
+        OpenApiParameter(name="search", type=str, location=OpenApiParameter.QUERY, required=False),
+        OpenApiParameter(name="fields", type=str, location=OpenApiParameter.QUERY, required=False,
+                         description="Comma separated fields to return"),
+    ],
+    responses={200: OpenApiResponse(description="CSV or NDJSON file")},
+    tags=["Verification"]
+)
+class VerificationLogExportView(VerificationLogListView):
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        logs = self.filter_queryset(self.get_queryset()).order_by('-timestamp', '-id')
+        return export_response(request, logs, self.get_serializer(), 'verification-logs')
 
 
 @extend_schema(
@@ -336,38 +577,27 @@ class VerificationLogListView(generics.ListAPIView):
 @permission_classes([permissions.IsAuthenticated])
 def verification_stats(request):
     """Get verification statistics"""
-    user = request.user
-
-    if user.role == 'admin':
-        total_verifications = VerificationRequest.objects.count()
-        successful_verifications = VerificationRequest.objects.filter(verification_result=True).count()
-        qr_verifications = VerificationRequest.objects.filter(verification_method='qr').count()
-    elif user.role == 'organization':
-        total_verifications = VerificationRequest.objects.filter(certificate__issuer=user).count()
-        successful_verifications = VerificationRequest.objects.filter(
-            certificate__issuer=user, verification_result=True
-        ).count()
-        qr_verifications = VerificationRequest.objects.filter(
-            certificate__issuer=user, verification_method='qr'
-        ).count()
-    else:
-        total_verifications = VerificationRequest.objects.filter(certificate__holder=user).count()
-        successful_verifications = VerificationRequest.objects.filter(
-            certificate__holder=user, verification_result=True
-        ).count()
-        qr_verifications = VerificationRequest.objects.filter(
-            certificate__holder=user, verification_method='qr'
-        ).count()
+    scope = get_access_scope(request.user)
+    verifications = VerificationRequest.objects.filter(scope.certificate_activity(issuer_field='issuer'))
+
+    counts = verification_counts(verifications)
+    total_verifications = counts['total_verifications']
+    successful_verifications = counts['successful_verifications']
+    qr_verifications = counts['qr_verifications']
 
     failed_verifications = total_verifications - successful_verifications
     success_rate = (successful_verifications / total_verifications * 100) if total_verifications > 0 else 0
     qr_usage_rate = (qr_verifications / total_verifications * 100) if total_verifications > 0 else 0
 
-    return Response({
+    stats = {
         'total_verifications': total_verifications,
         'successful_verifications': successful_verifications,
         'failed_verifications': failed_verifications,
         'qr_verifications': qr_verifications,
         'success_rate': round(success_rate, 2),
         'qr_usage_rate': round(qr_usage_rate, 2)
-    })
+    }
+    if scope.is_platform_admin:
+        # Lookups of unknown certificates today, by method and whether the filter caught them
+        stats['unknown_lookups_today'] = failed_lookup_counts()
+    return Response(stats)